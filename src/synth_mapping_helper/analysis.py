@@ -1,7 +1,5 @@
 from io import BytesIO
 from dataclasses import dataclass, field
-from datetime import datetime
-from datetime import datetime
 from typing import Any, Generator, Literal
 
 import numpy as np
@@ -43,48 +41,59 @@ END_PADDING = 1.0  # notes should not be in the last second to avoid them not sh
 
 @dataclass
 class PlotDataContainer:
-    times: list[float]
+    times: "list[float] | numpy array (n,)"
     plot_data: "numpy array (n, 2)"
     max_value: float = field(init=False)
-    plot_times: list[np.datetime64] = field(init=False)
 
     def __post_init__(self) -> None:
         self.max_value = self.plot_data[:,1].max() if self.plot_data.shape[0] else 0.0
-        self.plot_times = [np.datetime64(datetime.utcfromtimestamp(t)) for t in self.plot_data[:,0]]
 
 # DENSITY
 
-def density(times: list[float], window: float) -> PlotDataContainer:
+def density(times: "list[float] | numpy array (n,)", window: float) -> PlotDataContainer:
     # prepares density plot
-    if not times:
+    if not len(times):
         return PlotDataContainer(times=[], plot_data=np.zeros((0,2)))
-    # time, count
-    out: list[tuple[float, int]] = []
-    visible_t: list[float] = []
-    c = 0  # tracks len(visible_t)
-    for t in sorted(times):
-        start = t - window
-        while c and visible_t[0] < start:
-            # always create two datapoints to force discrete "steps"
-            out.append((visible_t[0], c))
-            out.append((visible_t[0], c-1))
-            visible_t = visible_t[1:]
-            c -= 1
-        out.append((start, c))
-        out.append((start, c+1))
-        visible_t.append(t)
-        c += 1
-    while visible_t:
-        out.append((visible_t[0], c))
-        out.append((visible_t[0], c-1))
-        visible_t = visible_t[1:]
-        c -= 1
-
+    # every time enters the window at t-window and leaves it at t
+    leave_t = np.sort(times)
+    enter_t = leave_t - window
+    n = leave_t.shape[0]
+    idx = np.arange(n)
+    # when an enter and a leave happen at the same time, the enter comes first
+    leaves_before_enter = np.searchsorted(leave_t, enter_t, side="left")
+    enters_before_leave = np.searchsorted(enter_t, leave_t, side="right")
+
+    # always create two datapoints per step to force discrete "steps"
+    # rows 2i and 2i+1 hold the i-th step (in order of time), with the count before and after it
+    plot_data = np.empty((4*n, 2))
+    enter_row = 2*(idx + leaves_before_enter)
+    enter_c = idx - leaves_before_enter
+    plot_data[enter_row, 0] = plot_data[enter_row+1, 0] = enter_t
+    plot_data[enter_row, 1] = enter_c
+    plot_data[enter_row+1, 1] = enter_c + 1
+    leave_row = 2*(idx + enters_before_leave)
+    leave_c = enters_before_leave - idx
+    plot_data[leave_row, 0] = plot_data[leave_row+1, 0] = leave_t
+    plot_data[leave_row, 1] = leave_c
+    plot_data[leave_row+1, 1] = leave_c - 1
     return PlotDataContainer(
         times=times,
-        plot_data=np.array(out)
+        plot_data=_compact_polyline(plot_data),
     )
 
+def _compact_polyline(points: "numpy array (n, 2)") -> "numpy array (m, 2)":
+    # drops points that don't change the drawn line: repeated points and points in the middle of straight horizontal or vertical runs
+    # steps that go up and back down at the same time are kept
+    points = points[np.concatenate(([True], (points[1:] != points[:-1]).any(axis=-1)))]
+    if points.shape[0] < 3:
+        return points
+    prev_p, p, next_p = points[:-2], points[1:-1], points[2:]
+    same_x = (prev_p[:,0] == p[:,0]) & (p[:,0] == next_p[:,0]) & ((p[:,1] - prev_p[:,1]) * (next_p[:,1] - p[:,1]) >= 0)
+    same_y = (prev_p[:,1] == p[:,1]) & (p[:,1] == next_p[:,1]) & ((p[:,0] - prev_p[:,0]) * (next_p[:,0] - p[:,0]) >= 0)
+    keep = np.ones(points.shape[0], dtype=bool)
+    keep[1:-1] = ~(same_x | same_y)
+    return points[keep]
+
 def wall_mode(highest_density: float, *, combined: bool) -> str:
     mode = "OK"
     if combined:
@@ -102,23 +111,20 @@ def note_densities(data: DataContainer) -> dict[str, dict[str, PlotDataContainer
     window_b = utils.second_to_beat(RENDER_WINDOW_NOTES, bpm=data.bpm)
     out = {}
     for nt in NOTE_TYPES:
-        # time, node_count
-        notes = [(t, n.shape[0]) for t, n in getattr(data, nt).items()]
+        notes = getattr(data, nt)
+        note_times = np.fromiter(notes, dtype=np.float64, count=len(notes))
+        node_counts = np.fromiter((n.shape[0] for n in notes.values()), dtype=np.int64, count=len(notes))
         # time for every single node (excluding rail head)
-        all_nodes = [
-            xyt[2]
-            for t, n in getattr(data, nt).items()
-            for xyt in n[1:]
-        ]
+        rail_nodes = [n[1:,2] for n in notes.values() if n.shape[0] > 1]
         out[nt] = {
-            "note": density(times=[t for t,_ in notes], window=window_b),
-            "single": density(times=[t for t, c in notes if c==1], window=window_b),
-            "rail": density(times=[t for t, c in notes if c>1], window=window_b),
-            "rail node": density(times=all_nodes, window=window_b),
+            "note": density(times=note_times, window=window_b),
+            "single": density(times=note_times[node_counts == 1], window=window_b),
+            "rail": density(times=note_times[node_counts > 1], window=window_b),
+            "rail node": density(times=np.concatenate(rail_nodes) if rail_nodes else np.zeros(0), window=window_b),
         }
     out["combined"] = {
         k: density(
-            times=[t for nt in NOTE_TYPES for t in out[nt][k].times],
+            times=np.concatenate([out[nt][k].times for nt in NOTE_TYPES]),
             window=window_b
         )
         for k in out[NOTE_TYPES[0]]
@@ -133,11 +139,16 @@ def all_note_densities(diffs: dict[str, DataContainer]) -> dict[str, dict[str, d
 
 def wall_densities(data: DataContainer) -> dict[str, PlotDataContainer]:
     window_b = RENDER_WINDOW_WALL*data.bpm/60
+    # sort once, so the per-type selections are already in order when density() sorts them again
+    times = np.fromiter(data.walls.keys(), dtype=float, count=len(data.walls))
+    type_ids = np.fromiter((w[0,3] for w in data.walls.values()), dtype=float, count=len(data.walls))
+    order = np.argsort(times)
+    times, type_ids = times[order], type_ids[order]
     out = {
-        wt: density(times=[t for t, w in data.walls.items() if w[0,3] == tid], window=window_b)
+        wt: density(times=times[type_ids == tid], window=window_b)
         for wt, (tid, *_) in WALL_TYPES.items()
     }
-    out["combined"] = density(times=list(data.walls), window=window_b)
+    out["combined"] = density(times=times, window=window_b)
     return out
 
 def all_wall_densities(diffs: dict[str, DataContainer]) -> dict[str, dict[str, PlotDataContainer]]:
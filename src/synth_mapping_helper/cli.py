@@ -2,6 +2,7 @@ from argparse import ArgumentParser, RawDescriptionHelpFormatter
 import itertools
 from json import JSONDecodeError
 from pathlib import Path
+import random
 
 import numpy as np
 
@@ -40,11 +41,11 @@ def do_random_movement(options, data: synth_format.DataContainer, filter_types:
         if len(options.rotate_random) == 1:
             area = options.rotate_random[0]
         else:
-            areas = np.array([
-                max(a[1]-a[1], 0.01)  # area, where 0-width areas are counted as 0.01 for numerical stability
+            areas = [
+                max(a[1]-a[0], 0.01)  # area, where 0-width areas are counted as 0.01 for numerical stability
                 for a in options.rotate_random
-            ])
-            area = options.rotate_random[np.random.choice(len(areas), p=areas/sum(areas))]
+            ]
+            area = random.choices(options.rotate_random, weights=areas)[0]
         random_angle = np.random.random_sample() * (area[1]-area[0]) + area[0]
         data.apply_for_all(movement.rotate, angle=random_angle, relative=options.relative, pivot=np.array(options.pivot), mirror_left=options.mirror_left, types=filter_types)
 
@@ -52,11 +53,11 @@ def do_random_movement(options, data: synth_format.DataContainer, filter_types:
         if len(options.offset_random) == 1:
             area = options.offset_random[0]
         else:
-            areas = np.array([
+            areas = [
                 max(a[1,0]-a[0,0], 0.01)*max(a[1,1]-a[0,1], 0.01)  # area, where 0-width axes are counted as 0.01 for numerical stability
                 for a in options.offset_random
-            ])
-            area = options.offset_random[np.random.choice(len(areas), p=areas/sum(areas))]
+            ]
+            area = random.choices(options.offset_random, weights=areas)[0]
         random_offset = pattern_generation.random_xy(1, area[0], area[1])[0]
         data.apply_for_all(movement.offset, [random_offset[0], random_offset[1], 0], mirror_left=options.mirror_left, types=filter_types)
     
@@ -1,5 +1,4 @@
 import asyncio
-import base64
 from io import BytesIO
 from concurrent.futures.process import BrokenProcessPool
 import dataclasses
@@ -7,25 +6,183 @@ from pathlib import Path
 from typing import Optional
 import sys
 
+from fastapi import Request
+from fastapi.responses import Response
 import librosa
 from nicegui import app, events, run, ui
 import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 
 from synth_mapping_helper.gui_tabs.utils import *
 from synth_mapping_helper.utils import pretty_list, pretty_fraction, beat_to_second, second_to_beat
 from synth_mapping_helper import synth_format, movement, analysis, audio_format, __version__, rails
 
 NOTE_COLORS = {"right": "red", "left": "blue", "single": "green", "both": "orange", "combined": "black"}
+WALL_SCATTER_ORDER = ("combined", *synth_format.WALL_TYPES)
+NOTE_SCATTER_ORDER = ("combined", *synth_format.NOTE_TYPES)
 
 WARNING_MAX = 100  # Tab stops working if there are too many
 
+# wall density thresholds for showing limit lines and initially visible traces
+PC_DESPAWN_VIS = 0.95 * analysis.PC_TYPE_DESPAWN
+QUEST_WIREFRAME_VIS = 0.9 * analysis.QUEST_WIREFRAME_LIMIT
+QUEST_RENDER_VIS = 0.9 * analysis.QUEST_RENDER_LIMIT
+
+# shared by the density and hand plots, on top of plotly's default look
+PLOT_TEMPLATE = go.layout.Template(pio.templates["plotly"])
+PLOT_TEMPLATE.layout.update(
+    legend=go.layout.Legend(x=0, xanchor="left", y=1, yanchor="bottom", orientation="h"),
+    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
+    hovermode="x unified",
+)
+
+# binary data served by URL instead of inlining it as base64, by client id and name
+_media_files: dict[tuple[str, str], tuple[bytes, str, int]] = {}
+
+def _serve_media(name: str, data: bytes, media_type: str) -> str:
+    client = ui.context.client
+    key = (client.id, name)
+    if key not in _media_files:
+        client.on_disconnect(lambda: _media_files.pop(key, None))
+        version = 0
+    else:
+        old_data, _, version = _media_files[key]
+        if old_data is not data:
+            version += 1  # new url, so the browser does not show a cached version
+    _media_files[key] = (data, media_type, version)
+    return f"/file_utils_media/{client.id}/{name}?v={version}"
+
+@app.get("/file_utils_media/{client_id}/{name}")
+def media_proxy(client_id: str, name: str, request: Request) -> Response:
+    if (client_id, name) not in _media_files:
+        return Response(status_code=404)
+    data, media_type, _ = _media_files[(client_id, name)]
+    # browsers need range requests to be able to seek in audio
+    range_header = request.headers.get("range", "")
+    if range_header.startswith("bytes=") and data:
+        start_str, _, end_str = range_header[6:].split(",")[0].partition("-")
+        try:
+            if start_str:
+                start = int(start_str)
+                end = min(int(end_str), len(data)-1) if end_str else len(data)-1
+            else:  # suffix range: last n bytes
+                start = max(len(data)-int(end_str), 0)
+                end = len(data)-1
+        except ValueError:
+            start, end = 0, -1
+        if not 0 <= start <= end:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{len(data)}"})
+        return Response(
+            content=data[start:end+1], status_code=206, media_type=media_type,
+            headers={"Content-Range": f"bytes {start}-{end}/{len(data)}", "Accept-Ranges": "bytes"},
+        )
+    return Response(content=data, media_type=media_type, headers={"Accept-Ranges": "bytes"})
+
 def _in_slot(func, slot):
     def _handler():
         with slot:
             return func()
     return _handler
 
+def _density_source(c: synth_format.DataContainer, types: tuple[str, ...]) -> tuple:
+    # bpm and the object dicts (compared by identity) with their lengths, to detect replaced or modified dicts
+    return (c.bpm, *((getattr(c, t), len(getattr(c, t))) for t in types))
+
+def _same_density_source(a: tuple|None, b: tuple) -> bool:
+    return a is not None and a[0] == b[0] and all(da is db and la == lb for (da, la), (db, lb) in zip(a[1:], b[1:]))
+
+def _bookmark_layout(bookmarks: dict[float, str]) -> dict[str, list[dict]]:
+    # same as add_vline with annotation, but built in one go instead of re-validating the layout for every bookmark
+    return {
+        "shapes": [
+            {"type": "line", "x0": t, "x1": t, "xref": "x", "y0": 0, "y1": 1, "yref": "y domain", "line": {"color": "lightgray", "dash": "dash"}}
+            for t in bookmarks
+        ],
+        "annotations": [
+            {"text": "🔖", "font": {"color": "gray"}, "hovertext": b, "showarrow": False, "x": t, "xref": "x", "xanchor": "center", "y": 0, "yref": "y domain", "yanchor": "bottom"}
+            for t, b in bookmarks.items()
+        ],
+    }
+
+def _wall_density_figure(den_dict: dict[str, analysis.PlotDataContainer], bookmarks: dict[float, str]) -> go.Figure:
+    wfig = go.Figure(
+        layout=go.Layout(
+            template=PLOT_TEMPLATE,
+            yaxis=go.layout.YAxis(title="Visible Walls (4s)"),
+        ),
+    )
+    wfig.update_layout(_bookmark_layout(bookmarks))
+
+    max_single_d = 0.0
+    # plain dicts added in one go, instead of validating each trace separately
+    traces: list[dict] = []
+    for wt in WALL_SCATTER_ORDER:
+        pdc = den_dict[wt]
+        if wt != "combined" and pdc.max_value > max_single_d:
+            max_single_d = pdc.max_value
+        if pdc.max_value:
+            traces.append({
+                "type": "scattergl",
+                "x": pdc.plot_data[:,0], "y": pdc.plot_data[:,1], "name": f"{wt} [{analysis.wall_mode(pdc.max_value, combined=(wt == 'combined'))}]",
+                "showlegend": True,
+                # start with only combined visible and single only when above PC limit
+                "visible": True if (wt == "combined" or pdc.max_value > PC_DESPAWN_VIS) else "legendonly",
+            })
+    wfig.add_traces(traces)
+
+    # show horizontal lines when combined y is close to or over the limit
+    max_com_d = den_dict["combined"].max_value
+    if max_com_d > QUEST_WIREFRAME_VIS:
+        wfig.add_hline(analysis.QUEST_WIREFRAME_LIMIT, line={"color": "gray", "dash": "dash"}, annotation=go.layout.Annotation(text="Quest wireframe (combined)", xanchor="left", yanchor="bottom"), annotation_position="left")
+    if max_com_d > QUEST_RENDER_VIS:
+        wfig.add_hline(analysis.QUEST_RENDER_LIMIT, line={"color": "red", "dash": "dash"}, annotation=go.layout.Annotation(text="Quest limit (combined)", xanchor="left", yanchor="bottom"), annotation_position="left")
+    # show horizontal lines when single y is over the limit
+    if max_single_d > PC_DESPAWN_VIS:
+        wfig.add_hline(analysis.PC_TYPE_DESPAWN, line={"color": "yellow", "dash": "dash"}, annotation=go.layout.Annotation(text="PC despawn (per type)", xanchor="left", yanchor="bottom"), annotation_position="left")
+    return wfig
+
+def _note_density_figure(den_dict: dict[str, dict[str, analysis.PlotDataContainer]], bookmarks: dict[float, str]) -> go.Figure:
+    # mostly the same thing as walls, but for combined notes and rail nodes
+    nfig = go.Figure(
+        layout=go.Layout(
+            template=PLOT_TEMPLATE,
+            yaxis=go.layout.YAxis(title="Visible (4s)"),
+            legend=go.layout.Legend(x=-0.05, xanchor="right", y=1, yanchor="top", orientation="v", groupclick="toggleitem"),
+        ),
+    )
+    nfig.update_layout(_bookmark_layout(bookmarks))
+
+    # skip empty types up front, most maps only use a few of them
+    non_empty = [
+        (nt, sub_t, pdc)
+        for nt in NOTE_SCATTER_ORDER
+        for sub_t, pdc in den_dict[nt].items()
+        if pdc.max_value
+    ]
+    nfig.add_traces([
+        {
+            "type": "scattergl",
+            "x": pdc.plot_data[:,0], "y": pdc.plot_data[:,1], "name": f"{nt} {sub_t}s [max {round(pdc.max_value)}]",
+            "showlegend": True,
+            "legendgroup": nt,
+            "line": {"color": NOTE_COLORS[nt]},
+            # start with only combined note visible
+            "visible": True if (nt == "combined" and sub_t == "note") else "legendonly",
+        }
+        for nt, sub_t, pdc in non_empty
+    ])
+    return nfig
+
+def _wall_density_plots(diffs: dict[str, synth_format.DataContainer], bookmarks: dict[float, str]) -> tuple[dict[str, dict[str, analysis.PlotDataContainer]], dict[str, go.Figure]]:
+    # runs in the process pool, so building the figures doesn't block the event loop either
+    densities = analysis.all_wall_densities(diffs)
+    return densities, {d: _wall_density_figure(den, bookmarks) for d, den in densities.items() if den["combined"].max_value}
+
+def _note_density_plots(diffs: dict[str, synth_format.DataContainer], bookmarks: dict[float, str]) -> tuple[dict[str, dict[str, dict[str, analysis.PlotDataContainer]]], dict[str, go.Figure]]:
+    densities = analysis.all_note_densities(diffs)
+    return densities, {d: _note_density_figure(den, bookmarks) for d, den in densities.items() if any(pdc.max_value for pdc in den["combined"].values())}
+
 def _file_utils_tab() -> None:
     @dataclasses.dataclass
     class FileInfo:
@@ -35,7 +192,6 @@ def _file_utils_tab() -> None:
         output_bpm: float = 0.0
         output_offset: int = 0
         output_finalize: bool = False
-        preview_audio: Optional[tuple[str, bytes]] = None
         # [diff][type]
         wall_densities: Optional[dict[str, dict[str, analysis.PlotDataContainer]]] = None
         # [diff][type][subtype]
@@ -44,8 +200,16 @@ def _file_utils_tab() -> None:
         hand_curves: Optional[dict[str, dict[str, analysis.HAND_CURVE_TYPE]]] = None
         # [diff]
         warnings: Optional[dict[str, list[analysis.Warning]]] = None
+        # [diff], see _density_source
+        wall_density_sources: dict[str, tuple] = dataclasses.field(default_factory=dict)
+        note_density_sources: dict[str, tuple] = dataclasses.field(default_factory=dict)
+        # [diff], with the bookmarks they were created with
+        wall_density_figures: dict[str, tuple[dict[float, str], go.Figure]] = dataclasses.field(default_factory=dict)
+        note_density_figures: dict[str, tuple[dict[float, str], go.Figure]] = dataclasses.field(default_factory=dict)
         bpm_scan_data: Optional[dict] = None
+        stats_grid: Optional[ui.aggrid] = None
         merged_filenames: list[str] = dataclasses.field(default_factory=list)
+        merge_update_pending: bool = False
 
         @property
         def is_valid(self) -> bool:
@@ -60,6 +224,10 @@ def _file_utils_tab() -> None:
             self.bpm_scan_data = None
             self.wall_densities = None
             self.note_densities = None
+            self.wall_density_sources = {}
+            self.note_density_sources = {}
+            self.wall_density_figures = {}
+            self.note_density_figures = {}
             self.hand_curves = None
             self.warnings = None
             self.refresh()
@@ -107,8 +275,27 @@ def _file_utils_tab() -> None:
                 ui.notify("Difference in audio files detected. Merge may yield weird results.", type="warning")
             self.data.merge(merge, merge_bookmarks=merge_bookmarks.value)
             self.merged_filenames.append(e.name)
-        
-            self.refresh()
+            for d in merge.difficulties:
+                # walls are merged in-place, so this is not always detected from the dicts
+                self.wall_density_sources.pop(d, None)
+                self.note_density_sources.pop(d, None)
+            # several files may be merged at once, only update once for all of them
+            if not self.merge_update_pending:
+                self.merge_update_pending = True
+                ui.timer(0.1, self._merge_update, once=True)
+
+        def _merge_update(self) -> None:
+            self.merge_update_pending = False
+            # results for the pre-merge map are stale, the stats card shows them as pending until _calc_warn and _calc_hcurve ran again
+            self.warnings = None
+            self.hand_curves = None
+            # merged notes and walls affect every derived view, densities skip difficulties that did not change
+            ui.timer(0.1, self._calc_warn, once=True)
+            ui.timer(0.2, self._calc_wden, once=True)
+            ui.timer(0.3, self._calc_nden, once=True)
+            ui.timer(0.4, self._calc_hcurve, once=True)
+            # metadata and audio are kept from the base file, so the info card stays as is
+            self.stats_card.refresh()
 
         def upload_cover(self, e: events.UploadEventArguments) -> None:
             upl: ui.upload = e.sender  # type:ignore
@@ -181,18 +368,19 @@ def _file_utils_tab() -> None:
             ui.download(data.getvalue(), filename=self.output_filename or "unnamed.synth")
 
         def save_errors(self):
-            out = [
-                "SMH-GUI fixed error report:",
-                f"  SMH Version: {__version__}",
-                f"  Base BPM: {self.data.bpm}",
-                f"  Base Offset: {self.data.offset_ms}",
-                f"  Merged {len(self.merged_filenames)} other files",
-            ]
+            buf = BytesIO()
+            buf.write((
+                "SMH-GUI fixed error report:\n"
+                f"  SMH Version: {__version__}\n"
+                f"  Base BPM: {self.data.bpm}\n"
+                f"  Base Offset: {self.data.offset_ms}\n"
+                f"  Merged {len(self.merged_filenames)} other files"
+            ).encode())
             for diff, errors in self.data.errors.items():
                 for jpe, time in errors:
-                    out.append(f"{diff}@{time}: {jpe!r}")
+                    buf.write(f"\n{diff}@{time}: {jpe!r}".encode())
 
-            ui.download('\n'.join(out).encode(), filename="smh_error_report.txt")
+            ui.download(buf.getvalue(), filename="smh_error_report.txt")
             info("Saved error log")
 
         def refresh(self) -> None:
@@ -213,10 +401,10 @@ def _file_utils_tab() -> None:
         def _audio_info(self) -> None:
             if self.data is None:
                 return
-            default_source = "data:audio/ogg;base64,"+base64.b64encode(self.data.audio.raw_data).decode()
+            default_source = _serve_media("audio", self.data.audio.raw_data, "audio/ogg")
             preview_audio = ui.audio(default_source)
             with ui.row():
-                with ui.number("BPM", min=1.0, max=600.0, step=0.1).props("dense").classes("w-20").bind_value(self, "output_bpm"):
+                with ui.number("BPM", min=1.0, max=600.0, step=0.1).props('dense debounce="300"').classes("w-20").bind_value(self, "output_bpm"):
                     ui.tooltip("").bind_text_from(self, "output_bpm", backward=lambda bpm: f"{round(60000/bpm)} ms/b" if bpm is not None else "Invalid")
                 def _multiply_bpm(mult: float) -> None:
                     self.output_bpm = round(self.output_bpm*mult, 3)
@@ -226,7 +414,7 @@ def _file_utils_tab() -> None:
                 ui.button("⅓", on_click=lambda _: _multiply_bpm(1/3), color="secondary").props("dense outline").classes("w-8 my-auto").tooltip("Divide BPM by 3")
                 ui.button("3", on_click=lambda _: _multiply_bpm(3)).props("dense outline").classes("w-8 my-auto").tooltip("Triple BPM")
             with ui.row():
-                with ui.number("Offset", min=0, step=1, suffix="ms").props("dense").classes("w-20").bind_value(self, "output_offset"):
+                with ui.number("Offset", min=0, step=1, suffix="ms").props('dense debounce="300"').classes("w-20").bind_value(self, "output_offset"):
                     def _update_offset_tooltip(_) -> str:
                         bpm = self.output_bpm
                         offset = self.output_offset
@@ -321,7 +509,7 @@ def _file_utils_tab() -> None:
                     btn: ui.button = e.sender  # type: ignore
                     btn.props('color="grey"').classes("cursor-wait")  # turn grey and indicate wait
                     data = await run.cpu_bound(audio_format.audio_with_clicks, raw_audio_data=self.data.audio.raw_data, duration=self.data.audio.duration, bpm=bpm, offset_ms=offset)
-                    preview_audio.set_source("data:audio/ogg;base64,"+base64.b64encode(data).decode())
+                    preview_audio.set_source(_serve_media("audio_clicks", data, "audio/ogg"))
                     btn.props('color="positive"').classes(remove="cursor-wait")  # reset visuals
                 ui.button(icon="timer", on_click=_add_clicks, color="positive").props("dense outline").classes("w-8 my-auto").tooltip("Add or update clicks in preview")
                 ui.button(icon="timer_off", on_click=lambda _: preview_audio.set_source(default_source), color="negative").props("dense outline").classes("w-8 my-auto").tooltip("Remove clicks from preview")
@@ -335,13 +523,13 @@ def _file_utils_tab() -> None:
             meta = self.data.meta
             with ui.row():
                 with ui.column().classes("w-40"):
-                    ui.input("Name").props("dense").classes("h-8").bind_value(meta, "name")
-                    ui.input("Artist").props("dense").classes("h-8").bind_value(meta, "artist")
-                    ui.input("Mapper").props("dense").classes("h-8").bind_value(meta, "mapper")
+                    ui.input("Name").props('dense debounce="300"').classes("h-8").bind_value(meta, "name")
+                    ui.input("Artist").props('dense debounce="300"').classes("h-8").bind_value(meta, "artist")
+                    ui.input("Mapper").props('dense debounce="300"').classes("h-8").bind_value(meta, "mapper")
                     ui.checkbox("Explicit lyrics").classes("h-8").props("dense").bind_value(meta, "explicit")
                 ui.separator().props("vertical")
                 with ui.upload(label="Replace Cover" if meta.cover_data else "Set Cover", auto_upload=True, on_upload=self.upload_cover).classes("w-32").props('accept="image/png"').add_slot("list"):
-                    ui.image("data:image/png;base64,"+base64.b64encode(meta.cover_data).decode()).tooltip(meta.cover_name)
+                    ui.image(_serve_media("cover", meta.cover_data, "image/png")).tooltip(meta.cover_name)
                 ui.separator().props("vertical")
                 with ui.upload(label="Edit / Replace Audio", auto_upload=True, on_upload=self.upload_audio).props('accept="audio/ogg,*/*"').classes("w-80").add_slot("list"):
                     self._audio_info()
@@ -548,12 +736,29 @@ def _file_utils_tab() -> None:
 
         @handle_errors
         async def _calc_wden(self):
-            self.wall_densities = await run.cpu_bound(analysis.all_wall_densities, diffs=self.data.difficulties)
+            # only recalculate difficulties that changed since the last calculation
+            sources = {d: _density_source(c, ("walls",)) for d, c in self.data.difficulties.items()}
+            changed = {d: c for d, c in self.data.difficulties.items() if not _same_density_source(self.wall_density_sources.get(d), sources[d])}
+            bookmarks = dict(self.data.bookmarks)
+            new_densities, new_figures = await run.cpu_bound(_wall_density_plots, diffs=changed, bookmarks=bookmarks) if changed else ({}, {})
+            self.wall_densities = {d: new_densities[d] if d in changed else self.wall_densities[d] for d in sources}
+            self.wall_density_sources = sources
+            self.wall_density_figures = {
+                d: f for d, f in self.wall_density_figures.items() if d in sources and d not in changed
+            } | {d: (bookmarks, f) for d, f in new_figures.items()}
             self._density_card.refresh()
 
         @handle_errors
         async def _calc_nden(self):
-            self.note_densities = await run.cpu_bound(analysis.all_note_densities, diffs=self.data.difficulties)
+            sources = {d: _density_source(c, synth_format.NOTE_TYPES) for d, c in self.data.difficulties.items()}
+            changed = {d: c for d, c in self.data.difficulties.items() if not _same_density_source(self.note_density_sources.get(d), sources[d])}
+            bookmarks = dict(self.data.bookmarks)
+            new_densities, new_figures = await run.cpu_bound(_note_density_plots, diffs=changed, bookmarks=bookmarks) if changed else ({}, {})
+            self.note_densities = {d: new_densities[d] if d in changed else self.note_densities[d] for d in sources}
+            self.note_density_sources = sources
+            self.note_density_figures = {
+                d: f for d, f in self.note_density_figures.items() if d in sources and d not in changed
+            } | {d: (bookmarks, f) for d, f in new_figures.items()}
             self._density_card.refresh()
 
         @handle_errors
@@ -568,106 +773,52 @@ def _file_utils_tab() -> None:
                 diffs=self.data.difficulties,
                 last_beat=second_to_beat(self.data.audio.duration-self.data.offset_ms/1000, bpm=self.data.bpm)
             )
-            self._stats_table.refresh()
+            self._update_stats_warnings()
             self._warnings_card.refresh()
 
-        def _wden_content(self, den_dict: dict[str, analysis.PlotDataContainer]) -> None:
-            wfig = go.Figure(
-                layout=go.Layout(
-                    yaxis=go.layout.YAxis(title="Visible Walls (4s)"),
-                    legend=go.layout.Legend(x=0, xanchor="left", y=1, yanchor="bottom", orientation="h"),
-                    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
-                    hovermode="x unified",
-                ),
-            )
-            for t, b in self.data.bookmarks.items():
-                wfig.add_vline(t, line={"color": "lightgray", "dash": "dash"}, annotation=go.layout.Annotation(text="🔖", font=dict(color="gray"), hovertext=b, xanchor="center", yanchor="bottom"), annotation_position="bottom")
-
-            # show horizontal lines when combined y is close to or over the limit
-            max_com_d = den_dict["combined"].max_value
-            if max_com_d > 0.9 * analysis.QUEST_WIREFRAME_LIMIT:
-                wfig.add_hline(analysis.QUEST_WIREFRAME_LIMIT, line={"color": "gray", "dash": "dash"}, annotation=go.layout.Annotation(text="Quest wireframe (combined)", xanchor="left", yanchor="bottom"), annotation_position="left")
-            if max_com_d > 0.9 * analysis.QUEST_RENDER_LIMIT:
-                wfig.add_hline(analysis.QUEST_RENDER_LIMIT, line={"color": "red", "dash": "dash"}, annotation=go.layout.Annotation(text="Quest limit (combined)", xanchor="left", yanchor="bottom"), annotation_position="left")
-            # show horizontal lines when single y is over the limit
-            max_single_d = max(pdc.max_value for wt, pdc in den_dict.items() if wt != "combined")
-            if max_single_d > 0.95 * analysis.PC_TYPE_DESPAWN:
-                wfig.add_hline(analysis.PC_TYPE_DESPAWN, line={"color": "yellow", "dash": "dash"}, annotation=go.layout.Annotation(text="PC despawn (per type)", xanchor="left", yanchor="bottom"), annotation_position="left")
-
-            for wt in ("combined", *synth_format.WALL_TYPES):
-                pdc = den_dict[wt]
-                if pdc.max_value:
-                    wfig.add_scattergl(
-                        x=pdc.plot_data[:,0], y=pdc.plot_data[:,1], name=f"{wt} [{analysis.wall_mode(pdc.max_value, combined=(wt == 'combined'))}]",
-                        showlegend=True,
-                        # start with only combined visible and single only when above PC limit
-                        visible=(wt == "combined" or pdc.max_value > 0.95 * analysis.PC_TYPE_DESPAWN) or "legendonly"
-                    )
+        def _wden_content(self, difficulty: str) -> None:
+            bookmarks, wfig = self.wall_density_figures.get(difficulty, (None, None))
+            if bookmarks != self.data.bookmarks:
+                # bookmarks were edited since the figure was built
+                wfig = _wall_density_figure(self.wall_densities[difficulty], self.data.bookmarks)
+                self.wall_density_figures[difficulty] = (dict(self.data.bookmarks), wfig)
             ui.plotly(wfig).classes("w-full h-96")
 
-        def _nden_content(self, den_dict: dict[str, dict[str, analysis.PlotDataContainer]]) -> None:
-            # mostly the same thing as walls, but for combined notes and rail nodes
-            nfig = go.Figure(
-                layout=go.Layout(
-                    yaxis=go.layout.YAxis(title="Visible (4s)"),
-                    legend=go.layout.Legend(x=-0.05, xanchor="right", y=1, yanchor="top", orientation="v", groupclick="toggleitem"),
-                    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
-                    hovermode="x unified",
-                ),
-            )
-            for t, b in self.data.bookmarks.items():
-                nfig.add_vline(t, line={"color": "lightgray", "dash": "dash"}, annotation=go.layout.Annotation(text="🔖", font=dict(color="gray"), hovertext=b, xanchor="center", yanchor="bottom"), annotation_position="bottom")
-
-            for nt in ("combined", *synth_format.NOTE_TYPES):
-                den_subdict = den_dict[nt]
-                for sub_t, pdc in den_subdict.items():
-                    if pdc.max_value:
-                        nfig.add_scattergl(
-                            x=pdc.plot_data[:,0], y=pdc.plot_data[:,1], name=f"{nt} {sub_t}s [max {round(pdc.max_value)}]",
-                            showlegend=True,
-                            legendgroup=nt,
-                            line={"color": NOTE_COLORS[nt]},
-                            # start with only combined note visible
-                            visible=(nt == "combined" and sub_t == "note") or "legendonly",
-                        )
+        def _nden_content(self, difficulty: str) -> None:
+            bookmarks, nfig = self.note_density_figures.get(difficulty, (None, None))
+            if bookmarks != self.data.bookmarks:
+                nfig = _note_density_figure(self.note_densities[difficulty], self.data.bookmarks)
+                self.note_density_figures[difficulty] = (dict(self.data.bookmarks), nfig)
             ui.plotly(nfig).classes("w-full h-128")
 
         def _hcurve_content(self, curves: dict[str, analysis.HAND_CURVE_TYPE]|None, warnings: list[analysis.Warning]|None, diff_data: synth_format.DataContainer) -> None:
             xfig = go.Figure(
                 layout=go.Layout(
+                    template=PLOT_TEMPLATE,
                     yaxis=go.layout.YAxis(title="X: right (+) <-> left (-)", range=(7,-7)),
-                    legend=go.layout.Legend(x=0, xanchor="left", y=1, yanchor="bottom", orientation="h"),
-                    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
-                    hovermode="x unified",
                 ),
             )
             yfig = go.Figure(
                 layout=go.Layout(
+                    template=PLOT_TEMPLATE,
                     yaxis=go.layout.YAxis(title="Y: down (-) <-> up (+)", range=(-5,5)),
-                    legend=go.layout.Legend(x=0, xanchor="left", y=1, yanchor="bottom", orientation="h"),
-                    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
-                    hovermode="x unified",
                 ),
             )
             vfig = go.Figure(
                 layout=go.Layout(
+                    template=PLOT_TEMPLATE,
                     yaxis=go.layout.YAxis(title="Velocity (m/s)"),
-                    legend=go.layout.Legend(x=0, xanchor="left", y=1, yanchor="bottom", orientation="h"),
-                    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
-                    hovermode="x unified",
                 ),
             )
             afig = go.Figure(
                 layout=go.Layout(
+                    template=PLOT_TEMPLATE,
                     yaxis=go.layout.YAxis(title="Acceleration (m/s²)"),
-                    legend=go.layout.Legend(x=0, xanchor="left", y=1, yanchor="bottom", orientation="h"),
-                    margin=go.layout.Margin(l=0, r=0, t=0, b=0),
-                    hovermode="x unified",
                 ),
             )
-            for t, b in self.data.bookmarks.items():
-                for f in (xfig, yfig, vfig, afig):
-                    f.add_vline(t, line={"color": "lightgray", "dash": "dash"}, annotation=go.layout.Annotation(text="🔖", font=dict(color="gray"), hovertext=b, xanchor="center", yanchor="bottom"), annotation_position="bottom")
+            bookmark_layout = _bookmark_layout(self.data.bookmarks)
+            for f in (xfig, yfig, vfig, afig):
+                f.update_layout(bookmark_layout)
 
             if curves is not None:
                 any_vel = False
@@ -824,6 +975,32 @@ def _file_utils_tab() -> None:
             if any_acc:
                 ui.plotly(afig).classes("w-full h-48")
 
+        def _warning_counts(self) -> dict[str, dict[str, int]|int]:
+            warning_counts: dict[str, dict[str, int]|int] = {
+                d: -1 
+                for d in self.data.difficulties.keys()
+            }
+            if self.warnings is not None:
+                for d in self.data.difficulties.keys():
+                    warnings = self.warnings.get(d, [])
+                    counts: dict[str, int] = {}
+                    for w in warnings:
+                        counts[w.type] = counts.get(w.type, 0) + 1
+                    counts["total"] = sum(counts.values())
+                    warning_counts[d] = counts
+            return warning_counts
+
+        def _update_stats_warnings(self) -> None:
+            # called by _calc_warn with fresh results, only the warnings column changed, so update the existing rows instead of rebuilding the grid and recounting everything
+            if self.stats_grid is None or self.stats_grid.is_deleted:
+                self._stats_table.refresh()
+                return
+            warning_counts = self._warning_counts()
+            rows = [r | {"warnings": warning_counts.get(r["diff"], -1)} for r in self.stats_grid.options["rowData"]]
+            if rows != self.stats_grid.options["rowData"]:
+                self.stats_grid.options["rowData"] = rows
+                self.stats_grid.update()
+
         @ui.refreshable
         def _stats_table(self) -> None:
             ui.label(f"{len(self.data.bookmarks)} Bookmarks")
@@ -838,19 +1015,8 @@ def _file_utils_tab() -> None:
                         type="info"
                     )
                     
-            warning_counts: dict[str, dict[str, int]|int] = {
-                d: -1 
-                for d in self.data.difficulties.keys()
-            }
-            if self.warnings is not None:
-                for d in self.data.difficulties.keys():
-                    warnings = self.warnings.get(d, [])
-                    counts: dict[str, int] = {}
-                    for w in warnings:
-                        counts[w.type] = counts.get(w.type, 0) + 1
-                    counts["total"] = sum(counts.values())
-                    warning_counts[d] = counts
-            ui.aggrid({
+            warning_counts = self._warning_counts()
+            self.stats_grid = ui.aggrid({
                 "domLayout": "autoHeight",
                 "columnDefs": [
                     {"headerName": "Difficulty", "field": "diff"},
@@ -940,7 +1106,7 @@ def _file_utils_tab() -> None:
             elif difficulty not in self.wall_densities or not self.wall_densities[difficulty]["combined"].max_value:
                 ui.label("No data").classes("h-32")
             else:
-                self._wden_content(self.wall_densities[difficulty])
+                self._wden_content(difficulty)
 
             ui.label("Note & Rail density")
             if self.note_densities is None:
@@ -948,7 +1114,7 @@ def _file_utils_tab() -> None:
             elif difficulty not in self.note_densities or not any(pdc.max_value for pdc in self.note_densities[difficulty]["combined"].values()):
                 ui.label("No data").classes("h-32")
             else:
-                self._nden_content(self.note_densities[difficulty])
+                self._nden_content(difficulty)
 
         @ui.refreshable
         def stats_card(self) -> None:
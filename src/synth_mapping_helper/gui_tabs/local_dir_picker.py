@@ -1,4 +1,5 @@
 # based on: https://github.com/zauberzeug/nicegui/blob/main/examples/local_file_picker/local_file_picker.py
+import os
 import platform
 from pathlib import Path
 from typing import Optional
@@ -16,6 +17,8 @@ class local_dir_picker(ui.dialog):
         :param upper_limit: The directory to stop at (None: no limit, default: same as the starting directory).
         """
         super().__init__()
+        self.path: Optional[Path] = None
+        self._grid_paths: list[str] = []
         with self, ui.card():
             self.add_drives_toggle()
             self.path_input = ui.input(
@@ -25,7 +28,9 @@ class local_dir_picker(ui.dialog):
             ).props("no-error-icon").classes("w-full")
             self.grid = ui.aggrid({
                 'columnDefs': [{'field': 'name', 'headerName': 'Directory'}],
-            }, html_columns=[0]).classes('w-96').on('cellClicked', lambda e: self.set_path(e.args['data']['path']))
+                # stable row ids let the grid update changed rows instead of rebuilding everything
+                ':getRowId': '(params) => params.data.path',
+            }, html_columns=[0]).classes('w-96').on('cellClicked', lambda e: self.set_path(e.args['data']['path'], force=True))
             with ui.row().classes('w-full justify-end'):
                 with ui.button('Cancel', on_click=self.close).props('outline'):
                     ui.tooltip(f"Keeps current path: {directory}")
@@ -35,40 +40,49 @@ class local_dir_picker(ui.dialog):
 
     def add_drives_toggle(self):
         with ui.row():
-            with ui.button(icon="home", on_click=lambda _: self.set_path("~")):
+            with ui.button(icon="home", on_click=lambda _: self.set_path("~", force=True)):
                 ui.tooltip(f"User home: {Path('~').expanduser()}")
-            with ui.button(icon="terminal", on_click=lambda _: self.set_path(str(Path().absolute()))):
+            with ui.button(icon="terminal", on_click=lambda _: self.set_path(str(Path().absolute()), force=True)):
                 ui.tooltip(f"Current directory: {Path().absolute()}")
             if platform.system() == 'Windows':
                 import win32api
                 drives = win32api.GetLogicalDriveStrings().split('\000')[:-1]
-                ui.toggle(drives, value=drives[0], on_change=lambda e: self.set_path(e.value))
+                ui.toggle(drives, value=drives[0], on_change=lambda e: self.set_path(e.value, force=True))
             else:
-                with ui.button("/", on_click=lambda _: self.set_path("/")):
+                with ui.button("/", on_click=lambda _: self.set_path("/", force=True)):
                     ui.tooltip("Filesystem root")
+            with ui.button(icon="refresh", on_click=lambda _: self.set_path(str(self.path), force=True)):
+                ui.tooltip("List current directory again")
 
-    def set_path(self, p: str):
+    def set_path(self, p: str, force: bool = False):
         pp = Path(p).expanduser().absolute()
-        if p and pp.is_dir():
+        # setting the input value triggers on_change again, avoid listing the same directory twice (unless explicitly requested)
+        if p and (force or pp != self.path) and pp.is_dir():
             self.path = pp
+            # scandir entries usually know their type already, unlike Path.is_dir() which needs a stat() per entry
+            with os.scandir(pp) as it:
+                entries = [e for e in it if e.is_dir()]
+            entries.sort(key=lambda e: e.name.lower())
             self.path_input.value = str(pp)
-            self.path_input.set_autocomplete(list(str(p) for p in pp.iterdir() if p.is_dir()))
-            self._update_grid()
+            self.path_input.set_autocomplete([e.path for e in entries])
+            self._update_grid(entries)
 
-    def _update_grid(self) -> None:
-        paths = list(p for p in self.path.iterdir() if p.is_dir())
-        paths.sort(key=lambda p: p.name.lower())
-
-        self.grid.options['rowData'] = [
+    def _update_grid(self, entries: list[os.DirEntry]) -> None:
+        row_data = [
             {
-                'name': f'📁 <strong>{p.name}</strong>',
-                'path': str(p),
+                'name': f'📁 <strong>{e.name}</strong>',
+                'path': e.path,
             }
-            for p in paths
+            for e in entries
         ]
         if self.path != self.path.parent:
-            self.grid.options['rowData'].insert(0, {
+            row_data.insert(0, {
                 'name': '↖️ <strong>..</strong>',
                 'path': str(self.path.parent),
             })
+        grid_paths = [r['path'] for r in row_data]
+        if grid_paths == self._grid_paths:
+            return
+        self._grid_paths = grid_paths
+        self.grid.options['rowData'] = row_data
         self.grid.update()
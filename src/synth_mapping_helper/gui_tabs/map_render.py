@@ -1,6 +1,11 @@
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+import json
+import math
+from typing import Any, Iterator
 
-from nicegui import app, elements, events, ui
+from nicegui import app, core, elements, events, ui
+from nicegui.awaitable_response import AwaitableResponse, NullResponse
 import numpy as np
 
 from synth_mapping_helper.gui_tabs.utils import SMHInput, handle_errors
@@ -9,13 +14,13 @@ from synth_mapping_helper import synth_format
 
 GRID_SIZE = (8, 6)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ObjectSettings:
     color: str
     opacity: float
     size: float
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RenderSettings:
     color_left: str = "#4ff"
     color_right: str = "#f4f"
@@ -31,10 +36,19 @@ class RenderSettings:
 
 DEFAULT_SETTINGS = RenderSettings()
 
-WALL_VERTS = {
-    i: np.array(synth_format.WALL_VERTS[synth_format.WALL_LOOKUP[i]])
-    for i in synth_format.WALL_LOOKUP
-}
+# x, time, y: order of map coordinates in the scene (time is also scaled), see MapScene.to_scene
+SCENE_AXES = np.array([0, 2, 1])
+# walls are extruded along z, this rotates them to point along the time axis
+WALL_TILT = math.pi / 2
+
+# decimals kept for coordinates sent to the browser, more is invisible and only makes messages longer
+SCENE_DECIMALS = 4
+
+# as nested lists, ready to be passed to extrusion, indexed by wall type id (unused ids are None)
+WALL_VERTS: list[list[list[float]]|None] = [
+    np.round(synth_format.WALL_VERTS[synth_format.WALL_LOOKUP[i]], SCENE_DECIMALS).tolist() if i in synth_format.WALL_LOOKUP else None
+    for i in range(max(synth_format.WALL_LOOKUP) + 1)
+]
 
 def make_input(label: str, value: str|float, storage_id: str, **kwargs) -> SMHInput:
     default_kwargs: dict[str, str|int] = {"tab_id": "render", "width": 14}
@@ -43,6 +57,8 @@ def make_input(label: str, value: str|float, storage_id: str, **kwargs) -> SMHIn
 class SettingsPanel(ui.element):
     def __init__(self) -> None:
         super().__init__()
+        # parsed settings, reset whenever any of the inputs changes
+        self._settings: RenderSettings|None = None
         with self:
             ui.label("Note: These settings only affect the preview.").tooltip("The game does not allow maps to override colors.")
             with ui.row():
@@ -57,13 +73,11 @@ class SettingsPanel(ui.element):
                 self.wall_outline_opacity = make_input("Opacity", DEFAULT_SETTINGS.wall_outline.opacity, "wall_outline_opacity")
             ui.separator().classes("my-2")
             with ui.row():
-                self.note_colors: dict[str, ui.color_input] = {
-                    t: ui.color_input(t.capitalize(), value=getattr(DEFAULT_SETTINGS, "color_"+t), preview=True).props("dense").classes("w-24 h-10")
-                    for t in synth_format.NOTE_TYPES
-                }
-                for t, ci in self.note_colors.items():
-                    ci.bind_value(app.storage.user, "render_color_"+t)
+                self.note_colors: dict[str, ui.color_input] = {}
+                for t in synth_format.NOTE_TYPES:
+                    ci = ui.color_input(t.capitalize(), value=getattr(DEFAULT_SETTINGS, "color_"+t), preview=True).props("dense").classes("w-24 h-10").bind_value(app.storage.user, "render_color_"+t)
                     ci.button.style("color: black")
+                    self.note_colors[t] = ci
             ui.separator().classes("my-2")
             with ui.row():
                 self.note_size = make_input("Note Size", DEFAULT_SETTINGS.note.size, "note_size", suffix="sq")
@@ -74,8 +88,21 @@ class SettingsPanel(ui.element):
                 ui.separator().props("vertical")
                 self.rail_node_size = make_input("Node Size", DEFAULT_SETTINGS.rail_node.size, "rail_node_size", suffix="sq")
                 self.rail_node_opacity = make_input("Opacity", DEFAULT_SETTINGS.rail_node.opacity, "rail_node_opacity")
+        for inp in (
+            self.wall_size, self.wall_color, self.wall_opacity, self.wall_outline_color, self.wall_outline_opacity, *self.note_colors.values(),
+            self.note_size, self.note_opacity, self.rail_size, self.rail_opacity, self.rail_node_size, self.rail_node_opacity,
+        ):
+            inp.on_value_change(self._invalidate_settings)
+
+    def _invalidate_settings(self) -> None:
+        self._settings = None
 
     def parse_settings(self) -> RenderSettings:
+        if self._settings is None:
+            self._settings = self._parse_settings()
+        return self._settings
+
+    def _parse_settings(self) -> RenderSettings:
         return RenderSettings(
             color_left=self.note_colors["left"].value,
             color_right=self.note_colors["right"].value,
@@ -93,10 +120,21 @@ class MapScene(ui.scene):
         kwargs.setdefault("grid", False)
         super().__init__(*args, **kwargs)
         self.time_scale = time_scale
-        self.walls: dict[float, tuple[elements.scene_objects.Extrusion, elements.scene_objects.Extrusion]] = {}
+        # body and outline (None when outlines are invisible)
+        self.walls: dict[float, tuple[elements.scene_objects.Extrusion, elements.scene_objects.Extrusion|None]] = {}
         self.wall_lookup: dict[str, float] = {}
+        # data and settings the current objects were created from, to only redraw what changed
+        self._wall_keys: dict[float, bytes] = {}
+        # [(type, time)]: data, head, rail segments
+        self._notes: dict[tuple[str, float], tuple[bytes, elements.scene_objects.Sphere, list[elements.scene_objects.QuadraticBezierTube]]] = {}
+        # [type]: all rail nodes of that type as a single object
+        self._rail_nodes: dict[str, elements.scene_objects.PointCloud] = {}
+        self._settings: RenderSettings|None = None
+        # scene method calls collected by batch()
+        self._method_batch: list[tuple[str, tuple]]|None = None
         with self:
-            self._obj_group = self.group()
+            self._wall_group = self.group()
+            self._note_group = self.group()
             self.move_camera(zoomout,-self.time_scale*zoomout/20,zoomout, 0,self.time_scale/2,0)
             for i in range(frame_length):
                 with self.group().move(0,(i+0.5)*self.time_scale,0):
@@ -109,52 +147,198 @@ class MapScene(ui.scene):
         if e.args.get("object_id") not in self.objects:
             return
         super()._handle_drag(e)
+
+    def run_method(self, name: str, *args: Any, timeout: float = 1) -> AwaitableResponse:
+        if self._method_batch is not None:
+            self._method_batch.append((name, args))
+            return NullResponse()
+        return super().run_method(name, *args, timeout=timeout)
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        # every created, moved or deleted object calls a method in the browser, send them all in one message instead
+        if self._method_batch is not None:
+            # nested, the outermost batch sends everything
+            yield
+            return
+        self._method_batch = []
+        try:
+            yield
+        finally:
+            batch, self._method_batch = self._method_batch, None
+            if batch and core.loop:
+                self.client.run_javascript(f'for (const [name, args] of {json.dumps(batch)}) runMethod({self.id}, name, args);')
+
+    def _delete_trees(self, roots: list[elements.scene_objects.Object3D]) -> None:
+        # Object3D.delete() scans all objects to find the children of each deleted object, which gets quadratic for large groups
+        children: dict[str, list[elements.scene_objects.Object3D]] = {}
+        for obj in self.objects.values():
+            children.setdefault(obj.parent.id, []).append(obj)
+        stack = list(roots)
+        while stack:
+            obj = stack.pop()
+            stack.extend(children.get(obj.id, ()))
+            del self.objects[obj.id]
+            obj._delete()
+
     def to_scene(self, xyt: "numpy array (3+)") -> tuple[float, float, float]:
-        return (xyt[0], xyt[2]*self.time_scale, xyt[1])
-    def _sphere(self, xyt: "numpy array (3+)", obj_settings: ObjectSettings, color: str) -> elements.scene_objects.Sphere:
-        return self.sphere(obj_settings.size).move(*self.to_scene(xyt)).material(color, obj_settings.opacity)
+        # plain floats, so the serializer does not have to unbox numpy scalars one by one
+        return tuple(self.to_scene_array(xyt[np.newaxis])[0].tolist())
+    def to_scene_array(self, xyt: "numpy array (n, 3+)") -> "numpy array (n, 3)":
+        # same as to_scene, for many points at once
+        sc = xyt[:, SCENE_AXES]
+        sc[:,1] *= self.time_scale
+        return sc.round(SCENE_DECIMALS)
+    def _sphere(self, pos: list[float], obj_settings: ObjectSettings, color: str) -> elements.scene_objects.Sphere:
+        return self.sphere(obj_settings.size).move(*pos).material(color, obj_settings.opacity)
 
     def wall_extrusion(self, xytwa: "numpy array (5)", thickness: float) -> elements.scene_objects.Extrusion:
         return self.extrusion(
-            WALL_VERTS[int(xytwa[0,3])].tolist(), -thickness,
+            WALL_VERTS[int(xytwa[0,3])], -thickness,
         ).rotate(
-            np.deg2rad(90), np.deg2rad(180 - xytwa[0,4]), 0
+            WALL_TILT, math.radians(180 - xytwa[0,4]), 0
         ).move(
             *self.to_scene(xytwa[0])
         )
 
-    def render(self, data: synth_format.DataContainer, settings: RenderSettings = RenderSettings()) -> None:
-        self._obj_group.delete()
-        with self.group() as self._obj_group:
-            for t, w in data.walls.items():
-                body = self.wall_extrusion(
-                    w, settings.wall.size * self.time_scale
-                ).material(
-                    settings.wall.color, settings.wall.opacity
-                )
-
-                with body:
-                    outline = self.extrusion(
-                        WALL_VERTS[int(w[0,3])].tolist(), -settings.wall.size * self.time_scale, wireframe=True
+    def wall_params(self, xytwa: "numpy array (n, 5)") -> "numpy array (n, 5)":
+        # same placement as wall_extrusion for many walls at once: type id, rotation around the time axis, scene position
+        out = np.empty((xytwa.shape[0], 5))
+        out[:,0] = xytwa[:,3]
+        out[:,1] = np.deg2rad(180 - xytwa[:,4])
+        out[:,2:] = self.to_scene_array(xytwa)
+        return out
+
+    def render(self, data: synth_format.DataContainer, settings: RenderSettings|None = None) -> None:
+        if settings is None:
+            settings = DEFAULT_SETTINGS
+        prev = self._settings
+        self._settings = settings
+        notes_by_type: dict[str, synth_format.SINGLE_COLOR_NOTES] = {ty: getattr(data, ty) for ty in synth_format.NOTE_TYPES}
+        # all objects are sent to the browser in one go
+        with self.batch():
+            # changed sizes need new geometry, everything else is kept and only gets new materials when needed
+            if prev is None or settings.wall.size != prev.wall.size or (settings.wall_outline.opacity > 0) != (prev.wall_outline.opacity > 0):
+                stale_walls = list(self.walls)
+            else:
+                stale_walls = [t for t, key in self._wall_keys.items() if t not in data.walls or data.walls[t].tobytes() != key]
+            if prev is None or (settings.note.size, settings.rail.size) != (prev.note.size, prev.rail.size):
+                stale_notes = list(self._notes)
+            else:
+                stale_notes = [
+                    (ty, t) for (ty, t), (key, *_) in self._notes.items()
+                    if t not in notes_by_type[ty] or notes_by_type[ty][t].tobytes() != key
+                ]
+            stale_roots: list[elements.scene_objects.Object3D] = []
+            for t in stale_walls:
+                body, _ = self.walls.pop(t)
+                del self.wall_lookup[body.id]
+                del self._wall_keys[t]
+                stale_roots.append(body)
+            for k in stale_notes:
+                stale_roots.append(self._notes.pop(k)[1])
+            # the point size can't be changed after creation
+            if prev is not None and settings.rail_node.size != prev.rail_node.size:
+                stale_roots.extend(self._rail_nodes.values())
+                self._rail_nodes = {}
+            self._delete_trees(stale_roots)
+            changed_types = {ty for ty, _ in stale_notes}
+
+            if prev is not None:
+                self._update_materials(prev, settings)
+
+            wall_depth = settings.wall.size * self.time_scale
+            new_walls = [(t, w) for t, w in data.walls.items() if t not in self.walls]
+            wall_params = self.wall_params(np.stack([w[0] for _, w in new_walls])).tolist() if new_walls else []
+            with self._wall_group:
+                for (t, w), (type_id, angle, *pos) in zip(new_walls, wall_params):
+                    body = self.extrusion(
+                        WALL_VERTS[int(type_id)], -wall_depth,
+                    ).rotate(
+                        WALL_TILT, angle, 0
+                    ).move(
+                        *pos
                     ).material(
-                        settings.wall_outline.color, settings.wall_outline.opacity
+                        settings.wall.color, settings.wall.opacity
                     )
-                self.walls[t] = (body, outline)
-                self.wall_lookup[body.id] = t
-            for ty in synth_format.NOTE_TYPES:
-                color: str = getattr(settings, "color_" + ty)
-                for _, n in getattr(data, ty).items():
-                    parent = self._sphere(n[0], settings.note, color)
-                    with parent:
-                        diff = n - n[0]
-                        for i in range(1, n.shape[0]):
-                            self._sphere(diff[i], settings.rail_node, color)
-
-                            self.quadratic_bezier_tube(
-                                list(self.to_scene(diff[i-1])),
-                                list(self.to_scene((diff[i-1]+diff[i])/2)),
-                                list(self.to_scene(diff[i])),
-                                radius=settings.rail.size,
+
+                    outline = None
+                    # the body is always needed, since it is also used for selecting walls
+                    if settings.wall_outline.opacity > 0:
+                        with body:
+                            outline = self.extrusion(
+                                WALL_VERTS[int(type_id)], -wall_depth, wireframe=True
                             ).material(
-                                color, settings.rail.opacity
+                                settings.wall_outline.color, settings.wall_outline.opacity
                             )
+                    self.walls[t] = (body, outline)
+                    self.wall_lookup[body.id] = t
+                    self._wall_keys[t] = w.tobytes()
+            with self._note_group:
+                for ty, notes in notes_by_type.items():
+                    color: str = getattr(settings, "color_" + ty)
+                    new_notes = [(t, n) for t, n in notes.items() if (ty, t) not in self._notes]
+                    if new_notes:
+                        changed_types.add(ty)
+                    # scene positions of all new heads at once
+                    heads = self.to_scene_array(np.stack([n[0] for _, n in new_notes])).tolist() if new_notes else []
+                    # nodes relative to their note head, for all new notes at once
+                    offsets = np.cumsum([0] + [n.shape[0] for _, n in new_notes]).tolist()
+                    if new_notes:
+                        nodes = np.concatenate([n for _, n in new_notes])
+                        rel = self.to_scene_array(nodes - np.repeat(nodes[offsets[:-1]], np.diff(offsets), axis=0))
+                        # bezier control points between consecutive nodes (pairs across two notes are never used)
+                        mids = ((rel[:-1] + rel[1:]) * 0.5).tolist()
+                        sc = rel.tolist()
+                    for (t, n), head, start, end in zip(new_notes, heads, offsets, offsets[1:]):
+                        parent = self._sphere(head, settings.note, color)
+                        segments = []
+                        with parent:
+                            for i in range(start + 1, end):
+                                segments.append(self.quadratic_bezier_tube(
+                                    sc[i-1],
+                                    mids[i-1],
+                                    sc[i],
+                                    radius=settings.rail.size,
+                                ).material(
+                                    color, settings.rail.opacity
+                                ))
+                        self._notes[(ty, t)] = (n.tobytes(), parent, segments)
+
+                    # one object for all rail nodes instead of a sphere each, sized like the spheres they replace
+                    if ty not in self._rail_nodes or ty in changed_types:
+                        rail_nodes = [n[1:] for n in notes.values() if n.shape[0] > 1]
+                        points = self.to_scene_array(np.concatenate(rail_nodes)).tolist() if rail_nodes else []
+                        if ty in self._rail_nodes:
+                            self._rail_nodes[ty].set_points(points)
+                        else:
+                            self._rail_nodes[ty] = self.point_cloud(
+                                points, point_size=2*settings.rail_node.size
+                            ).material(
+                                color, settings.rail_node.opacity
+                            )
+
+    def _update_materials(self, prev: RenderSettings, settings: RenderSettings) -> None:
+        if settings.wall != prev.wall or settings.wall_outline != prev.wall_outline:
+            for body, outline in self.walls.values():
+                body.material(settings.wall.color, settings.wall.opacity)
+                if outline is not None:
+                    outline.material(settings.wall_outline.color, settings.wall_outline.opacity)
+        for ty in synth_format.NOTE_TYPES:
+            color: str = getattr(settings, "color_" + ty)
+            color_changed = color != getattr(prev, "color_" + ty)
+            update_note = color_changed or settings.note.opacity != prev.note.opacity
+            update_node = color_changed or settings.rail_node.opacity != prev.rail_node.opacity
+            update_rail = color_changed or settings.rail.opacity != prev.rail.opacity
+            if update_node and ty in self._rail_nodes:
+                self._rail_nodes[ty].material(color, settings.rail_node.opacity)
+            if not (update_note or update_rail):
+                continue
+            for (note_ty, _), (_, head, segments) in self._notes.items():
+                if note_ty != ty:
+                    continue
+                if update_note:
+                    head.material(color, settings.note.opacity)
+                if update_rail:
+                    for seg in segments:
+                        seg.material(color, settings.rail.opacity)
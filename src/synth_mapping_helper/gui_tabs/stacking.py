@@ -1,3 +1,6 @@
+from functools import lru_cache
+import heapq
+from operator import itemgetter
 from typing import Any, Optional
 
 from nicegui import app, ui, elements
@@ -7,31 +10,41 @@ import pyperclip
 from .utils import *
 from .map_render import SettingsPanel, MapScene
 from ..utils import parse_number, parse_range, parse_xy_range, pretty_fraction, pretty_list
-from .. import synth_format, movement, pattern_generation
+from .. import synth_format, pattern_generation
 
-def _icon_scale(val: str|None, icons: dict) -> str:
+_SCALE_ICONS = {1: "add", 0: "close", -1: "remove"}
+_SCALE_AXIS_ICONS = {1: "unfold_more", -1: "unfold_less"}
+_IDENTITY_SCALE = np.ones(3)
+# synth_format.WALL_MIRROR_ID as array, indexed by wall type id
+_WALL_MIRROR_LOOKUP = np.array([synth_format.WALL_MIRROR_ID.get(i, i) for i in range(max(synth_format.WALL_MIRROR_ID) + 1)], dtype=float)
+
+@lru_cache(maxsize=64)
+def _scale_direction(val: str) -> int|None:
+    # 1: grow, -1: shrink, 0: unchanged, None: invalid
     if not val:
-        return icons.get(0, "close")
+        return 0
     try:
         v = parse_number(val)
     except ValueError:
+        return None
+    return 1 if v > 1 else -1 if v < 1 else 0
+
+def _icon_scale(val: str|None, icons: dict) -> str:
+    direction = _scale_direction(val or "")
+    if direction is None:
         return "error"
-    if v > 1:
-        return icons.get(1, "add")
-    if v < 1:
-        return icons.get(-1, "remove")
-    return icons.get(0, "close")
-
-def _mark_inputs(on: bool, *inp: ui.input) -> None:
-    for i in inp:
-        if on:
-            i.props('bg-color="grey-6"')
-        else:
-            i.props(remove='bg-color="grey-6"')
+    return icons.get(direction, _SCALE_ICONS[direction])
+
+def _mark_inputs_js(on: bool, *inp: ui.input) -> str:
+    # same look as bg-color="grey-6", but toggled in the browser without any message to the server
+    return (
+        f"() => {{ for (const id of {[i.id for i in inp]}) "
+        f"document.querySelector(`#c${{id}} .q-field__control`)?.classList.toggle('bg-grey-6', {'true' if on else 'false'}); }}"
+    )
 
 def _register_marking(bt: ui.button, *inp: ui.input) -> ui.button:
-    bt.on("pointerenter", lambda _: _mark_inputs(True, *inp))
-    bt.on("pointerleave", lambda _: _mark_inputs(False, *inp))
+    bt.on("pointerenter", js_handler=_mark_inputs_js(True, *inp))
+    bt.on("pointerleave", js_handler=_mark_inputs_js(False, *inp))
     return bt
 
 def _clear_button(*inp: ui.input) -> ui.button:
@@ -44,81 +57,215 @@ def _clear_button(*inp: ui.input) -> ui.button:
     return bt
 
 def _find_first(types: tuple[str, ...] = synth_format.ALL_TYPES) -> Optional[tuple[str, "numpy array (3)"]]:
-    with safe_clipboard_data(use_original=False, write=False) as d:
-        return d.find_first()
+    # read only, so the cached clipboard data can be used without a copy
+    return read_clipboard_data().find_first(types)
 
 
 def _find_first_pair(types: tuple[str, ...] = synth_format.ALL_TYPES) -> Optional[tuple[str, "numpy array (3)", "numpy array (3)"]]:
-    with safe_clipboard_data(use_original=False, write=False) as d:
-        first_t: Optional[str] = None
-        first: Optional["numpy array (3+)"] = None
-        second: Optional["numpy array (3+)"] = None
-        for t in types:
-            ty_objs = sorted(d.get_object_dict(t).items())
-            if len(ty_objs) < 2:
-                continue
-            _, ty_first = ty_objs[0]
-            if second is None or ty_first[0,2] < second[2]:
-                first_t = t
-                first = ty_first[0]
-                _, ty_second = ty_objs[1]
-                second = ty_second[0]
-        if first_t is None:
-            return None
-        return first_t, first, second
+    d = read_clipboard_data()
+    first_t: Optional[str] = None
+    first: Optional["numpy array (3+)"] = None
+    second: Optional["numpy array (3+)"] = None
+    for t in types:
+        ty_objs = d.get_object_dict(t)
+        if len(ty_objs) < 2:
+            continue
+        if second is not None and min(ty_objs) >= second[2]:
+            # starts too late to replace the current pair
+            continue
+        # only the first two are needed, no need to sort everything
+        (_, ty_first), (_, ty_second) = heapq.nsmallest(2, ty_objs.items(), key=itemgetter(0))
+        if second is None or ty_first[0,2] < second[2]:
+            first_t = t
+            first = ty_first[0]
+            second = ty_second[0]
+    if first_t is None:
+        return None
+    return first_t, first, second
+
+def _copy_transforms(
+    count: int, pivot: "numpy array (3)", offset: "numpy array (3)", scale: "numpy array (3)", rotation: float,
+) -> tuple["numpy array (count, 3, 3)", "numpy array (count, 3)"]:
+    """matrices and offsets for every copy, position of copy k is matrices[k] @ xyz + offsets[k]"""
+    # one step: scale and rotate around pivot, then offset (same as movement.scale, movement.rotate and movement.offset)
+    rad_ang = np.radians(rotation)
+    step = np.identity(3)
+    step[:2, :2] = [
+        [np.cos(rad_ang), -np.sin(rad_ang)],
+        [np.sin(rad_ang), np.cos(rad_ang)],
+    ]
+    step = step.dot(np.diag(scale))
+    if scale[0] != scale[1]:
+        step_offset = pivot - step.dot(pivot) + offset
+        matrices = np.empty((count, 3, 3))
+        offsets = np.empty((count, 3))
+        matrices[0] = step
+        offsets[0] = step_offset
+        for k in range(1, count):
+            matrices[k] = step.dot(matrices[k-1])
+            offsets[k] = step.dot(offsets[k-1]) + step_offset
+        return matrices, offsets
+    # uniform xy scale commutes with the rotation, so the k-th power is a rotation by k*angle scaled by scale**k
+    steps = np.arange(1, count + 1)
+    angles = steps * rad_ang
+    xy_scale = np.float_power(scale[0], steps)
+    matrices = np.zeros((count, 3, 3))
+    matrices[:, 0, 0] = np.cos(angles) * xy_scale
+    matrices[:, 0, 1] = -np.sin(angles) * xy_scale
+    matrices[:, 1, 0] = np.sin(angles) * xy_scale
+    matrices[:, 1, 1] = np.cos(angles) * xy_scale
+    matrices[:, 2, 2] = np.float_power(scale[2], steps)
+    # offset of copy k is pivot - M^(k+1) pivot + (I + M + ... + M^k) offset
+    power_sums = np.identity(3) + np.cumsum(matrices, axis=0) - matrices
+    offsets = pivot - matrices.dot(pivot) + power_sums.dot(offset)
+    return matrices, offsets
+
+def _outset_copies(
+    xyz: "numpy array (n, 3)", step: "numpy array (3, 3)", offset: "numpy array (3)", pivot: "numpy array (3)", outset: float,
+    out: "numpy array (count, n, 3+)",
+) -> None:
+    """outset is not linear, so each copy is calculated from the previous one (step followed by movement.outset)"""
+    # relative to pivot, the step is just the matrix plus the offset and outset needs no further subtraction
+    rel = xyz - pivot
+    for k in range(out.shape[0]):
+        rel = rel.dot(step.T) + offset
+        # like movement.outset: positions close to the pivot stay, the rest move away from it
+        moved = (np.abs(rel[:, :2]) > 1e-5).any(axis=-1)
+        rel_xy = rel[moved, :2]
+        rel[moved, :2] = rel_xy + rel_xy * (outset / np.hypot(rel_xy[:, 0], rel_xy[:, 1]))[:, np.newaxis]
+        out[k, :, :3] = rel + pivot
 
 def _stack(
-    d: synth_format.DataContainer, count: int, pivot: tuple[float, float, float],
-    offset: tuple[float, float, float], scale: tuple[float, float, float], rotation: float, wall_rotation: float, outset: float,
+    d: synth_format.DataContainer, count: int, pivot: "numpy array (3)",
+    offset: "numpy array (3)", scale: "numpy array (3)", rotation: float, wall_rotation: float, outset: float,
     random_ranges_offset: list[tuple[tuple[float, float], tuple[float, float]]]|None, random_step_offset: tuple[float, float]|None, random_ranges_angle: list[tuple[float, float]]|None, random_step_angle: float|None
-):
-    pivot_np = np.array(pivot)
-    stacking = d.filtered()  # deep copy
+) -> dict[str, int]:
+    """stacks in place, returns the number of notes, rails, rail_nodes and walls that were added (not counting replaced ones)"""
+    counts = {"notes": 0, "rails": 0, "rail_nodes": 0, "walls": 0}
+    if count < 1:
+        return counts
+    # accepts anything array-like, but the conversion is free when already given float arrays
+    pivot = np.asarray(pivot, dtype=float)
+    offset = np.asarray(offset, dtype=float)
+    scale = np.asarray(scale, dtype=float)
+    if scale[2] == 0:
+        raise ValueError("Cannot have 0 for time scale")
+    # decided once, so the common cases skip the work that would not change anything
+    translate_only = np.array_equal(scale, _IDENTITY_SCALE) and not rotation and not outset
+    if translate_only:
+        # copy k is just moved by (k+1) offsets, no matrices needed
+        offsets = np.arange(1, count + 1)[:, np.newaxis] * offset
+    else:
+        matrices, offsets = _copy_transforms(count, pivot, offset, scale, rotation)
+
+    # random offset and rotation of each copy, these are not passed on to the next copy
     rng = np.random.default_rng()
-    for _ in range(count):
-        if scale != [1,1,1]:
-            stacking.apply_for_all(movement.scale, scale_3d=scale, pivot=pivot_np)
-        if rotation:
-            stacking.apply_for_all(movement.rotate, angle=rotation, pivot=pivot_np)
-        if wall_rotation:
-            stacking.apply_for_walls(movement.rotate, angle=wall_rotation, relative=True)
-        stacking.apply_for_all(movement.offset, offset_3d=offset)
-        if outset:
-            stacking.apply_for_all(movement.outset, outset_scalar=outset, pivot=pivot_np)
-        if random_ranges_offset is not None or random_ranges_angle is not None:
-            tmp = stacking.filtered()  # deep copy
-            if random_ranges_offset is not None:
-                if len(random_ranges_offset) == 1:
-                    area = random_ranges_offset[0]
-                else:
-                    areas = np.array([
-                        max(x_max-x_min, 0.01)*max(y_max-y_min, 0.01)  # area, where 0-width axes are counted as 0.01 for numerical stability
-                        for (x_min, y_min), (x_max, y_max) in random_ranges_offset
-                    ])
-                    area = rng.choice(random_ranges_offset, p=areas/sum(areas))
-                if random_step_offset is not None:
-                    xy_min, xy_max = area
-                    random_offset = [random_step_offset[axis] * rng.integers(round(xy_min[axis]/random_step_offset[axis]), round(xy_max[axis]/random_step_offset[axis]), endpoint=True) for axis in (0,1)]
-                else:
-                    random_offset = pattern_generation.random_xy(1, area[0], area[1])[0]
-                tmp.apply_for_all(movement.offset, offset_3d=[random_offset[0], random_offset[1], 0])
+    random_offsets = np.zeros((count, 2))
+    if random_ranges_offset is not None:
+        # pick the range for every copy up front, weighted by size
+        ranges_xy = np.array(random_ranges_offset, dtype=float)  # (range, min/max, x/y)
+        areas = np.maximum(ranges_xy[:, 1] - ranges_xy[:, 0], 0.01).prod(axis=-1)  # area, where 0-width axes are counted as 0.01 for numerical stability
+        area_cdf = np.cumsum(areas) / areas.sum()
+        area_cdf[-1] = 1.0  # rounding may leave it just below 1, which would pick past the last range
+        area_choice = np.searchsorted(area_cdf, rng.random(count), side="right")
+        xy_min, xy_max = ranges_xy[area_choice].transpose(1, 0, 2)
+        if random_step_offset is not None:
+            step_xy = np.array(random_step_offset)
+            random_offsets = step_xy * rng.integers(np.round(xy_min/step_xy).astype(int), np.round(xy_max/step_xy).astype(int), endpoint=True)
+        else:
+            random_offsets = pattern_generation.random_xy(count, xy_min, xy_max)
+    random_rotations = np.zeros(count)
+    if random_ranges_angle is not None:
+        ranges_ang = np.array(random_ranges_angle, dtype=float)  # (range, min/max)
+        ang_areas = np.maximum(ranges_ang[:, 1] - ranges_ang[:, 0], 0.01)  # ang_area, where 0-width ranges are counted as 0.01 for numerical stability
+        ang_area_cdf = np.cumsum(ang_areas) / ang_areas.sum()
+        ang_area_cdf[-1] = 1.0  # rounding may leave it just below 1, which would pick past the last range
+        ang_area_choice = np.searchsorted(ang_area_cdf, rng.random(count), side="right")
+        ang_min, ang_max = ranges_ang[ang_area_choice].T
+        if random_step_angle is not None:
+            random_rotations = random_step_angle * rng.integers(np.round(ang_min/random_step_angle).astype(int), np.round(ang_max//random_step_angle).astype(int), endpoint=True)
+        else:
+            random_rotations = rng.uniform(ang_min, ang_max)
+
+    sources: dict[str, list["numpy array (n, 3+)"]] = {}
+    for t in synth_format.NOTE_TYPES + ("walls", "lights", "effects"):
+        objs = [o for _, o in sorted(getattr(d, t).items())]
+        if scale[2] < 0:
+            # reversed copies are keyed by the end of each rail, only the last object ending at any given time survives
+            objs = list({o[-1, 2]: o for o in objs}.values())
+        if objs:
+            sources[t] = objs
+    if not sources:
+        return counts
+    rows_by_type = {t: np.concatenate(objs) for t, objs in sources.items()}
+
+    # positions of all objects in one array, transformed for all copies at once
+    xyz = np.concatenate([rows[:, :3] for rows in rows_by_type.values()])
+    positions = np.empty((count,) + xyz.shape)
+    if translate_only:
+        positions[:] = xyz + offsets[:, np.newaxis]
+    elif outset:
+        _outset_copies(xyz, matrices[0], offset, pivot, outset, positions)
+    else:
+        positions[:] = np.einsum("kij,nj->kni", matrices, xyz) + offsets[:, np.newaxis]
+    if random_ranges_angle is not None:
+        # random offset, then random rotation around pivot
+        random_rad = np.radians(random_rotations)
+        random_matrices = np.array([
+            [np.cos(random_rad), -np.sin(random_rad)],
+            [np.sin(random_rad), np.cos(random_rad)],
+        ]).transpose(2, 0, 1)
+        positions[..., :2] = np.einsum("kij,knj->kni", random_matrices, positions[..., :2] + random_offsets[:, np.newaxis] - pivot[:2]) + pivot[:2]
+    elif random_ranges_offset is not None:
+        positions[..., :2] += random_offsets[:, np.newaxis]
+
+    end = 0
+    for t, objs in sources.items():
+        rows = rows_by_type[t]
+        start, end = end, end + rows.shape[0]
+        starts = np.cumsum([o.shape[0] for o in objs[:-1]], dtype=int)
+        if t == "walls":
+            out = np.empty((count,) + rows.shape)
+            out[..., :3] = positions[:, start:end]
+            mirrored = (scale[0] < 0) != (scale[1] < 0)
+            not_crouch = rows[:, 3] != synth_format.WALL_TYPES["crouch"][0]
+            # angle change per step, mirroring swaps type and inverts the angle (so every second copy is the same)
+            angle_step = (180 if scale[1] < 0 else 0) + (rotation + wall_rotation) * not_crouch
+            if mirrored:
+                out[0::2, :, 3] = _WALL_MIRROR_LOOKUP[rows[:, 3].astype(int)]
+                out[0::2, :, 4] = angle_step - rows[:, 4]
+                out[1::2, :, 3] = rows[:, 3]
+                out[1::2, :, 4] = rows[:, 4]
+            else:
+                out[..., 3] = rows[:, 3]
+                out[..., 4] = rows[:, 4] + np.arange(1, count+1)[:, np.newaxis] * angle_step
             if random_ranges_angle is not None:
-                if len(random_ranges_angle) == 1:
-                    ang_area = random_ranges_angle[0]
-                else:
-                    ang_areas = np.array([
-                        max(a_max-a_min, 0.01)  # ang_area, where 0-width axes are counted as 0.01 for numerical stability
-                        for a_max, a_min in random_ranges_angle
-                    ])
-                    ang_area = rng.choice(random_ranges_angle, p=ang_areas/sum(ang_areas))
-                if random_step_angle is not None:
-                    random_rotation = random_step_angle * rng.integers(round(ang_area[0]/random_step_angle), round(ang_area[1]//random_step_angle), endpoint=True)
-                else:
-                    random_rotation = rng.uniform(ang_area[0], ang_area[1])
-                tmp.apply_for_all(movement.rotate, angle=random_rotation, pivot=pivot_np)
-            d.merge(tmp)
+                out[..., 4] += random_rotations[:, np.newaxis] * not_crouch
         else:
-            d.merge(stacking)
+            out = positions[:, start:end]
+        if scale[2] < 0:
+            # negative time scale reverses each rail on every other copy
+            reverse = np.arange(rows.shape[0])
+            for r_start, r_end in zip([0, *starts], [*starts, rows.shape[0]]):
+                reverse[r_start:r_end] = reverse[r_start:r_end][::-1]
+            out[0::2] = out[0::2, reverse]
+        # split the buffer of all copies back into objects, later copies replace earlier ones (and the originals)
+        splits = (np.arange(count)[:, np.newaxis] * rows.shape[0] + np.concatenate(([0], starts))).ravel()[1:]
+        new_objs = {o[0, 2]: o for o in np.split(out.reshape(-1, rows.shape[1]), splits)}
+        existing = getattr(d, t)
+        # copies that replace an object at the same time are not counted as added
+        added = [o for ti, o in new_objs.items() if ti not in existing]
+        existing.update(new_objs)
+        # counted like DataContainer.get_counts, but only for the added objects
+        if t == "walls":
+            counts["walls"] += len(added)
+        elif t in synth_format.NOTE_TYPES:
+            n_nodes = np.fromiter((o.shape[0] for o in added), dtype=int, count=len(added))
+            notes = int(np.count_nonzero(n_nodes == 1))
+            counts["notes"] += notes
+            counts["rails"] += len(n_nodes) - notes
+            counts["rail_nodes"] += int(n_nodes.sum()) - len(n_nodes)
+    return counts
 
 def make_input(label: str, value: str|float, storage_id: str, **kwargs) -> SMHInput:
     default_kwargs: dict[str, str|int] = {"tab_id": "stacking", "width": 24}
@@ -145,6 +292,29 @@ def _stacking_tab() -> None:
             with _register_marking(ui.button("Pivot", icon="colorize", on_click=_pick_pivot).props("outline size=sm align=left").classes("w-full"), pivot_x, pivot_y):
                 ui.tooltip("Place pivot at first note")
             _clear_button(pivot_x, pivot_y)
+
+        # shared by the pair pickers
+        def _pick_pair_around_pivot() -> tuple[str, "numpy array (3+)", "numpy array (2, 2)"]|None:
+            """type, delta between the pair and both xy positions relative to the pivot"""
+            tfs = _find_first_pair()
+            if tfs is None:
+                raise PrettyError(msg="No object pair found!")
+            t, first, second = tfs
+            try:
+                p = np.array((pivot_x.parsed_value, pivot_y.parsed_value))
+            except ParseInputError as pie:
+                error(f"Error parsing value: {pie.input_id}", pie, data=pie.value)
+                return None
+            if any(np.isclose(first[:2], p)):
+                error(f"{t} object pair too close to pivot", context={"pivot": p.tolist()}, data={"type": t, "first": first.tolist(), "second": second.tolist()})
+                return None
+            return t, second - first, np.stack((first[:2], second[:2])) - p
+
+        def _set_pair_time_and_wall(delta: "numpy array (3+)", ang: float = 0) -> None:
+            offset_t.set_value(pretty_fraction(delta[2]))
+            if len(delta) >= 5:
+                walls_angle.set_value(str(round((delta[4]-ang+180)%360-180, 4)))
+
         with ui.card():
             ui.label("Offset")
             offset_x = make_input("X", "0", "offset_x", suffix="sq", negate_icons={1: "east", -1: "west"})
@@ -158,9 +328,7 @@ def _stacking_tab() -> None:
                 delta = second - first
                 offset_x.set_value(pretty_fraction(delta[0]))
                 offset_y.set_value(pretty_fraction(delta[1]))
-                offset_t.set_value(pretty_fraction(delta[2]))
-                if len(delta) >= 5:
-                    walls_angle.set_value(str(round((delta[4]+180)%360-180, 4)))
+                _set_pair_time_and_wall(delta)
                 info(f"Set offset from {t} object pair")
             with ui.button("Offset", icon="colorize", on_click=_pick_offset).props("outline size=sm align=left").classes("w-full") as pick_offset:
                 ui.tooltip("Calculate offset between first two objects of the same type")
@@ -169,31 +337,20 @@ def _stacking_tab() -> None:
             ui.label("Scale")
             scale_x = make_input("X", "100%", "scale_x", tooltip="Can be given as % or ratio")
             with scale_x.add_slot("prepend"):
-                ui.icon("close").classes("rotate-90").bind_name_from(scale_x, "value", lambda v: _icon_scale(v, {1: "unfold_more", -1: "unfold_less"}))
+                ui.icon("close").classes("rotate-90").bind_name_from(scale_x, "value", lambda v: _icon_scale(v, _SCALE_AXIS_ICONS))
             scale_y = make_input("Y", "100%", "scale_y", tooltip="Can be given as % or ratio")
             with scale_y.add_slot("prepend"):
-                ui.icon("close").bind_name_from(scale_y, "value", lambda v: _icon_scale(v, {1: "unfold_more", -1: "unfold_less"}))
+                ui.icon("close").bind_name_from(scale_y, "value", lambda v: _icon_scale(v, _SCALE_AXIS_ICONS))
             @handle_errors
             def _pick_scale():
-                tfs = _find_first_pair()
-                if tfs is None:
-                    raise PrettyError(msg="No object pair found!")
-                t, first, second = tfs
-                delta = second - first
-                try:
-                    p = [pivot_x.parsed_value, pivot_y.parsed_value]
-                except ParseInputError as pie:
-                    error(f"Error parsing value: {pie.input_id}", pie, data=pie.value)
-                    return
-                if any(np.isclose(first[:2], p)):
-                    error(f"{t} object pair too close to pivot", data={"type": t, "first": first.tolist(), "second": second.tolist(), "pivot": p})
+                pair = _pick_pair_around_pivot()
+                if pair is None:
                     return
-                s_xy = (second[:2] - p) / (first[:2] - p)
+                t, delta, (first_rel, second_rel) = pair
+                s_xy = second_rel / first_rel
                 scale_x.set_value(pretty_fraction(s_xy[0]))
                 scale_y.set_value(pretty_fraction(s_xy[1]))
-                offset_t.set_value(pretty_fraction(delta[2]))
-                if len(delta) >= 5:
-                    walls_angle.set_value(str(round((delta[4]+180)%360-180, 4)))
+                _set_pair_time_and_wall(delta)
                 info(f"Set scale from {t} object pair")
             with ui.button("Scale", icon="colorize", on_click=_pick_scale).props("outline size=sm align=left").classes("w-full mt-auto") as pick_scale:
                 ui.tooltip("Calculate scale (XY) between first two objects of the same type")
@@ -204,27 +361,16 @@ def _stacking_tab() -> None:
             outset_amount = make_input("Outset", "0", "outset", suffix="sq", negate_icons={1: "open_in_full", -1: "close_fullscreen"})
             @handle_errors
             def _pick_rot():
-                tfs = _find_first_pair()
-                if tfs is None:
-                    raise PrettyError(msg="No object pair found!")
-                t, first, second = tfs
-                delta = second - first
-                try:
-                    p = [pivot_x.parsed_value, pivot_y.parsed_value]
-                except ParseInputError as pie:
-                    error(f"Error parsing value: {pie.input_id}", pie, data=pie.value)
-                    return
-                if any(np.isclose(first[:2], p)):
-                    error(f"{t} object pair too close to pivot", settings={"pivot": p}, data={"type": t, "first": first.tolist(), "second": second.tolist()})
+                pair = _pick_pair_around_pivot()
+                if pair is None:
                     return
-                first = first[:2] - p
-                second = second[:2] - p
-                ang = np.degrees(np.arctan2(first[0], first[1])) - np.degrees(np.arctan2(second[0], second[1]))
+                t, delta, ((f_x, f_y), (s_x, s_y)) = pair
+                # angle from first to second in one atan2 (of cross and dot product), which also keeps it within +-180
+                ang = np.degrees(np.arctan2(f_x*s_y - f_y*s_x, f_x*s_x + f_y*s_y))
+                distances = np.hypot((f_x, s_x), (f_y, s_y))
                 pattern_angle.set_value(pretty_fraction(ang))
-                outset_amount.set_value(pretty_fraction(np.sqrt(second.dot(second)) - np.sqrt(first.dot(first))))
-                offset_t.set_value(pretty_fraction(delta[2]))
-                if len(delta) >= 5:
-                    walls_angle.set_value(str(round((delta[4]+360-ang+180)%360-180, 4)))
+                outset_amount.set_value(pretty_fraction(distances[1] - distances[0]))
+                _set_pair_time_and_wall(delta, ang)
                 info(f"Set rotation and outset from {t} object pair")
             with ui.button("Rotate", icon="colorize", on_click=_pick_rot).props("outline size=sm align=left").classes("w-full") as pick_rot:
                 ui.tooltip("Calculate Rotation and Outset between first two objects of the same type")
@@ -244,8 +390,11 @@ def _stacking_tab() -> None:
                 if divisor == 0:  # avoid division by 0 when angles match
                     error(f"Wall pair ({t}) have matching angle, cannot determine spiral", data={"first": first.tolist(), "second": second.tolist()})
                     return
-                # calculate pivot naively
-                p = first[:3] + movement.rotate((second - first)[:3]/2, 90 - ang/2) / divisor
+                # calculate pivot naively: half the distance rotated towards the center (only xy is needed)
+                dx, dy = (second[:2] - first[:2]) / 2
+                rot_rad = np.radians(90 - ang/2)
+                c, s = np.cos(rot_rad), np.sin(rot_rad)
+                p = (first[0] + (c*dx - s*dy) / divisor, first[1] + (s*dx + c*dy) / divisor)
                 pivot_x.set_value(pretty_fraction(p[0]))
                 pivot_y.set_value(pretty_fraction(p[1]))
 
@@ -280,9 +429,9 @@ def _stacking_tab() -> None:
             o_t = offset_t.parsed_value
             if not o_t:
                 raise PrettyError("Time offset must not be 0", data=offset_t.value)
-            p = (pivot_x.parsed_value, pivot_y.parsed_value, 0)
-            o = (offset_x.parsed_value, offset_y.parsed_value, o_t)
-            s = (scale_x.parsed_value, scale_y.parsed_value, 1)
+            p = np.array((pivot_x.parsed_value, pivot_y.parsed_value, 0.0))
+            o = np.array((offset_x.parsed_value, offset_y.parsed_value, o_t))
+            s = np.array((scale_x.parsed_value, scale_y.parsed_value, 1.0))
             r = pattern_angle.parsed_value
             wr = walls_angle.parsed_value
             outset = outset_amount.parsed_value
@@ -315,15 +464,19 @@ def _stacking_tab() -> None:
                     random_step_angle = None
             except ValueError as ve:
                 raise PrettyError(msg="Error parsing random angle ranges", exc=ve, data=random_angle.value) from ve
+            if count_mode == "count":
+                c = int(count.parsed_value)
+            elif count_mode == "duration":
+                c = int(duration.parsed_value / o_t)
+            elif count_mode == "fill":
+                # cached, so this does not add a parse to the one below
+                c = int(read_clipboard_data(use_original=True).selection_length / o_t)
+            if c < 1:
+                # nothing to do, skip copying the clipboard data
+                raise PrettyError(msg="Nothing to stack", context={"mode": count_mode, "count": c})
             try:
                 with safe_clipboard_data(use_original=True, realign_start=False) as d:  # type: synth_format.ClipboardDataContainer
-                    if count_mode == "count":
-                        c = int(count.parsed_value)
-                    elif count_mode == "duration":
-                        c = int(duration.parsed_value / o_t)
-                    elif count_mode == "fill":
-                        c = int(d.selection_length / o_t)
-                    _stack(
+                    counts = _stack(
                         d=d, count=c, pivot=p,
                         offset=o, scale=s, rotation=r, wall_rotation=wr, outset=outset,
                         random_ranges_offset=random_ranges_offset, random_step_offset=random_step_offset,
@@ -335,12 +488,11 @@ def _stacking_tab() -> None:
                 raise PrettyError(
                     msg=f"Error executing stack",
                     exc=exc,
-                    context={"count": c, "pivot": p, "offset": o, "scale": s, "rotation": r, "wall_rotation": wr, "outset": outset},
+                    context={"count": c, "pivot": p.tolist(), "offset": o.tolist(), "scale": s.tolist(), "rotation": r, "wall_rotation": wr, "outset": outset},
                 ) from exc
-            counts = d.get_counts()
             info(
                 f"Completed stack",
-                caption=pretty_list([f"{counts[t]['total']} {t if counts[t]['total'] != 1 else t.rstrip('s')}" for t in ("notes", "rails", "rail_nodes", "walls")]),
+                caption="Added " + pretty_list([f"{counts[t]} {t if counts[t] != 1 else t.rstrip('s')}" for t in ("notes", "rails", "rail_nodes", "walls")]),
             )
             if preview_scene is not None:
                 preview_settings = sp.parse_settings()
@@ -368,10 +520,15 @@ def _stacking_tab() -> None:
             )
             @handle_errors
             def _subdivide(substeps: float) -> None:
-                for v in (offset_x, offset_y, pattern_angle, walls_angle,offset_t, outset_amount):
-                    v.set_value(pretty_fraction(v.parsed_value/substeps))
-                for v in (scale_x, scale_y):
-                    v.set_value(f"{v.parsed_value**(1/substeps):.1%}")
+                linear_inputs = (offset_x, offset_y, pattern_angle, walls_angle, offset_t, outset_amount)
+                scale_inputs = (scale_x, scale_y)
+                # parse everything first, so nothing is changed when any input is invalid
+                divided = (np.array([v.parsed_value for v in linear_inputs]) / substeps).tolist()
+                rooted = [v.parsed_value**(1/substeps) for v in scale_inputs]
+                for v, val in zip(linear_inputs, divided):
+                    v.set_value(pretty_fraction(val))
+                for v, val in zip(scale_inputs, rooted):
+                    v.set_value(f"{val:.1%}")
             subdiv = make_input("Substeps", "2", "subdiv", tooltip="Number of substeps (should be >1)", suffix="x")
             with subdiv.add_slot("prepend"):
                 ui.icon("density_medium")
@@ -398,9 +555,9 @@ def _stacking_tab() -> None:
                 with ui.button(icon="help", on_click=random_dialog.open).props('flat text-color=info').classes("w-4 h-4 text-xs cursor-help"):
                     ui.tooltip("Show range input format help")
             # custom input format, don't use SMHInput
-            random_offset = ui.input("XY Offset Range", value="").props('dense suffix="sq"').classes("w-24").bind_value(app.storage.user, "stacking_random_offset")
+            random_offset = ui.input("XY Offset Range", value="").props('dense suffix="sq" debounce="150"').classes("w-24").bind_value(app.storage.user, "stacking_random_offset")
             random_offset.default_value = ""
-            random_angle = ui.input("Rotation Range", value="").props('dense suffix="°"').classes("w-24").bind_value(app.storage.user, "stacking_random_angle")
+            random_angle = ui.input("Rotation Range", value="").props('dense suffix="°" debounce="150"').classes("w-24").bind_value(app.storage.user, "stacking_random_angle")
             random_angle.default_value = ""
             _clear_button(random_offset, random_angle)
 
@@ -408,13 +565,13 @@ def _stacking_tab() -> None:
         @handle_errors
         def _soft_refresh():
             try:
-                data = synth_format.ClipboardDataContainer.from_json(read_clipboard())
+                data = read_clipboard_data()
             except:
                 # fall back to empty data on error
                 data = synth_format.DataContainer()
             preview_settings = sp.parse_settings()
             if preview_scene is None:
-                draw_preview_scene.refresh()
+                draw_preview_scene.refresh(create=True)
             if preview_scene is not None:
                 preview_scene.render(data, preview_settings)
         with ui.row():
@@ -435,8 +592,11 @@ def _stacking_tab() -> None:
 
         @ui.refreshable
         @handle_errors
-        def draw_preview_scene():
+        def draw_preview_scene(create: bool = False):
             nonlocal preview_scene
+            if not create:
+                # the scene (and parsing the clipboard for it) waits until the preview is first requested
+                return
             w = int(scene_width.parsed_value)
             h = int(scene_height.parsed_value)
             l = int(frame_length.parsed_value)
@@ -444,7 +604,7 @@ def _stacking_tab() -> None:
             preview_scene = MapScene(width=w, height=h, frame_length=l, time_scale=t)
             _soft_refresh()
         draw_preview_scene()
-        apply_button.on("click", draw_preview_scene.refresh)
+        apply_button.on("click", lambda _: draw_preview_scene.refresh(create=True))
 
 stacking_tab = GUITab(
     name="stacking",
@@ -24,7 +24,7 @@ __all__ = [
     "error", "warning", "info",
     "wiki_reference", "try_load_synth_file", "add_suffix",
     "ParseInputError", "PrettyError", "handle_errors",
-    "read_clipboard", "write_clipboard", "safe_clipboard_data",
+    "read_clipboard", "write_clipboard", "read_clipboard_data", "safe_clipboard_data",
 ]
 
 logger = logging.getLogger("SMH-GUI")
@@ -72,13 +72,16 @@ class SMHInput(ui.input):
         **input_kwargs: Any,
     ):
         self.allow_empty = allow_empty
+        # last successfully parsed value and its result, values are only parsed again after they changed
+        self._parsed: tuple[str, float]|None = None
         super().__init__(label=label, value=str(default_value), validation=self._validate, **input_kwargs)
         if storage_id is not None:
             if tab_id is not None:
                 storage_id = f"{tab_id}_{storage_id}"
             self.bind_value(app.storage.user, storage_id)
         self.classes(f"w-{width} h-{height}")
-        self.props('dense input-style="text-align: right" no-error-icon')
+        # debounce collapses keystrokes client-side, so validation and storage updates are not sent for every character
+        self.props('dense input-style="text-align: right" no-error-icon debounce="150"')
         self.storage_id = storage_id
         self.default_value = default_value
         if suffix:
@@ -97,7 +100,7 @@ class SMHInput(ui.input):
                 if not val:  # empty string or None
                     return negate_icons[0]
                 try:
-                    v = utils.parse_number(val)
+                    v = self._parse(val)  # shares the cached result with validation and parsed_value
                 except ValueError:
                     return "error"
                 if v > 0:
@@ -110,24 +113,29 @@ class SMHInput(ui.input):
                     "click", lambda e: self.set_value(_negate(self.value))
                 ).bind_name_from(self, "value", _get_icon)
                 ui.tooltip("Click to negate")
-        with self.add_slot("error"):
-            ui.element().style("visiblity: hidden")
+        # an empty slot already replaces the error message, no element needed in it
+        self.add_slot("error")
 
     def _validate(self, value: Any) -> None|str:
         if self.allow_empty and not value:
             return None
         try:
-            v = utils.parse_number(value)
+            self._parse(value)
             return None
         except ValueError:
             return ""
 
+    def _parse(self, value: str) -> float:
+        if self._parsed is None or self._parsed[0] != value:
+            self._parsed = (value, utils.parse_number(value))
+        return self._parsed[1]
+
     @property
     def parsed_value(self) -> float | None:
         if self.allow_empty and not self.value:
             return None
         try:
-            return utils.parse_number(self.value)
+            return self._parse(self.value)
         except ValueError as ve:
             raise ParseInputError(input_id=self.storage_id or "input", value=self.value, exc=ve) from ve
 
@@ -271,9 +279,10 @@ def read_clipboard() -> str:
 def write_clipboard(text: str) -> None:
     pyperclip.copy(text)
 
-# like synth_format.clipboard_data, but reporting errors
-@contextmanager
-def safe_clipboard_data(use_original: bool = False, realign_start: bool = True, write: bool = True) -> Generator[synth_format.ClipboardDataContainer, None, None]:
+# parsed clipboard for read-only use, so repeated reads of unchanged content (ie picking values for stacking) skip the JSON parsing
+_clipboard_cache: dict[tuple[str, bool], synth_format.ClipboardDataContainer] = {}
+
+def _checked_clipboard() -> str:
     try:
         clipboard_in = read_clipboard()
     except RuntimeError as re:
@@ -282,11 +291,34 @@ def safe_clipboard_data(use_original: bool = False, realign_start: bool = True,
         raise PrettyError(msg="Clipboard does not contain any data")
     if not clipboard_in.startswith("{") or not clipboard_in.endswith("}"):
         raise PrettyError(msg="Clipboard does not contain JSON data")
+    return clipboard_in
+
+def _parse_clipboard(clipboard_in: str, use_original: bool) -> synth_format.ClipboardDataContainer:
     try:
-        data = synth_format.ClipboardDataContainer.from_json(clipboard_in, use_original=use_original)
+        return synth_format.ClipboardDataContainer.from_json(clipboard_in, use_original=use_original)
     except (KeyError, ValueError) as fje:
         raise PrettyError(msg="Error reading data in clipboard", exc=fje, data=clipboard_in)
 
+def read_clipboard_data(use_original: bool = False) -> synth_format.ClipboardDataContainer:
+    """parsed clipboard content, shared between calls while the clipboard is unchanged and thus must not be modified"""
+    clipboard_in = _checked_clipboard()
+    key = (clipboard_in, use_original)
+    if key not in _clipboard_cache:
+        parsed = _parse_clipboard(clipboard_in, use_original)
+        # only the most recent clipboard content is kept
+        _clipboard_cache.clear()
+        _clipboard_cache[key] = parsed
+    return _clipboard_cache[key]
+
+# like synth_format.clipboard_data, but reporting errors
+@contextmanager
+def safe_clipboard_data(use_original: bool = False, realign_start: bool = True, write: bool = True) -> Generator[synth_format.ClipboardDataContainer, None, None]:
+    clipboard_in = _checked_clipboard()
+    # callers may modify the data, so a cached parse is taken out of the cache instead of being shared
+    data = _clipboard_cache.pop((clipboard_in, use_original), None)
+    if data is None:
+        data = _parse_clipboard(clipboard_in, use_original)
+
     # don't catch any errors here, so clipboard is not written to on error
     yield data
 
@@ -153,58 +153,60 @@ def _wall_art_tab() -> None:
         def _update_cursors(self) -> None:
             if not self.sources or preview_scene is None:
                 return
-            first = min(self.sources)
-            copy_mode = self.copy_button ^ drag_copy.value
-            copy_offset = [0.0,0.0,_find_free_slot(first+self.offset[2])-first-self.offset[2],0.0,0.0] if copy_mode else 0.0
-            if self.drag_time is None:
-                # re-create cursors
-                for c in self.cursors.values():
-                    try:
-                        c.delete()
-                    except KeyError:
-                        # scene sometimes loses track of objects, so use internal delete
-                        c._delete()
-                preview_settings = sp.parse_settings()
-                with preview_scene:
-                    pivot_3d = walls[first][0,:3]
-                    scale_3d = np.array([1.0, -1.0 if self.mirrored else 1.0, 1.0])
-                    for t in self.sources:
-                        w = walls[t] + copy_offset
-                        w = movement.rotate(w, angle=self.rotation, pivot=pivot_3d)
-                        w = movement.scale(w, scale_3d=scale_3d, pivot=pivot_3d)
-                        w = movement.offset(w, self.offset)
-                        e = preview_scene.wall_extrusion(w, preview_settings.wall.size * time_scale.parsed_value).draggable()
-                        if copy_mode:
-                            e.material(copy_color.value, copy_opacity.parsed_value)
-                        else:
-                            e.material(move_color.value, move_opacity.parsed_value)
-                        self.cursors[t] = e
-                preview_scene.props('drag_constraints=""')
-            else:
-                w = walls[self.drag_time][0] + copy_offset
-                scene_pos = preview_scene.to_scene(w[:3] + self.offset)
-                # move cursor
-                cur = self.cursors[self.drag_time]
-                cur.move(*scene_pos)
-                rot = w[4]+self.rotation
-                if self.mirrored:
-                    cur.scale(1,-1,1)
-                    cur.rotate(np.deg2rad(90), np.deg2rad(180 + rot), 0)
-                else:
-                    cur.scale(1,1,1)
-                    cur.rotate(np.deg2rad(90), np.deg2rad(180 - rot), 0)
-                # update drag constraints
-                if self.axis_button ^ axis_z.value:
-                    scene_time_step = time_step.parsed_value*time_scale.parsed_value
-                    preview_scene.props(f'drag_constraints="x={scene_pos[0]},z={scene_pos[2]},y=Math.round(y/({scene_time_step}))*({scene_time_step})"')
+            # cursors can be many objects, send them all in one go
+            with preview_scene.batch():
+                first = min(self.sources)
+                copy_mode = self.copy_button ^ drag_copy.value
+                copy_offset = [0.0,0.0,_find_free_slot(first+self.offset[2])-first-self.offset[2],0.0,0.0] if copy_mode else 0.0
+                if self.drag_time is None:
+                    # re-create cursors
+                    for c in self.cursors.values():
+                        try:
+                            c.delete()
+                        except KeyError:
+                            # scene sometimes loses track of objects, so use internal delete
+                            c._delete()
+                    preview_settings = sp.parse_settings()
+                    with preview_scene:
+                        pivot_3d = walls[first][0,:3]
+                        scale_3d = np.array([1.0, -1.0 if self.mirrored else 1.0, 1.0])
+                        for t in self.sources:
+                            w = walls[t] + copy_offset
+                            w = movement.rotate(w, angle=self.rotation, pivot=pivot_3d)
+                            w = movement.scale(w, scale_3d=scale_3d, pivot=pivot_3d)
+                            w = movement.offset(w, self.offset)
+                            e = preview_scene.wall_extrusion(w, preview_settings.wall.size * time_scale.parsed_value).draggable()
+                            if copy_mode:
+                                e.material(copy_color.value, copy_opacity.parsed_value)
+                            else:
+                                e.material(move_color.value, move_opacity.parsed_value)
+                            self.cursors[t] = e
+                    preview_scene.props('drag_constraints=""')
                 else:
-                    preview_scene.props(f'drag_constraints="y={scene_pos[1]}"')
+                    w = walls[self.drag_time][0] + copy_offset
+                    scene_pos = preview_scene.to_scene(w[:3] + self.offset)
+                    # move cursor
+                    cur = self.cursors[self.drag_time]
+                    cur.move(*scene_pos)
+                    rot = w[4]+self.rotation
+                    if self.mirrored:
+                        cur.scale(1,-1,1)
+                        cur.rotate(np.deg2rad(90), np.deg2rad(180 + rot), 0)
+                    else:
+                        cur.scale(1,1,1)
+                        cur.rotate(np.deg2rad(90), np.deg2rad(180 - rot), 0)
+                    # update drag constraints
+                    if self.axis_button ^ axis_z.value:
+                        scene_time_step = time_step.parsed_value*time_scale.parsed_value
+                        preview_scene.props(f'drag_constraints="x={scene_pos[0]},z={scene_pos[2]},y=Math.round(y/({scene_time_step}))*({scene_time_step})"')
+                    else:
+                        preview_scene.props(f'drag_constraints="y={scene_pos[1]}"')
             
-            for c in self.cursors.values():
-                if copy_mode:
-                    c.material(copy_color.value, copy_opacity.parsed_value)
-                else:
-                    c.material(move_color.value, move_opacity.parsed_value)
+                for c in self.cursors.values():
+                    if copy_mode:
+                        c.material(copy_color.value, copy_opacity.parsed_value)
+                    else:
+                        c.material(move_color.value, move_opacity.parsed_value)
 
         def move(self, offset: "numpy array (3)") -> None:
             self.offset += offset
@@ -292,25 +294,26 @@ def _wall_art_tab() -> None:
                     break
             else:
                 return
-            for t, c in self.cursors.items():
-                if t != self.drag_time:
-                    c.delete()
-            pivot = walls[self.drag_time]
-            preview_settings = sp.parse_settings()
-            with self.cursors[self.drag_time]:
-                for t in self.sources:
+            with preview_scene.batch():
+                for t, c in self.cursors.items():
                     if t != self.drag_time:
-                        w = walls[t]
-                        relative = np.array([[0.0,0.0,0.0, w[0,3], 0.0]])
-                        e = preview_scene.wall_extrusion(relative, preview_settings.wall.size * time_scale.parsed_value)
-                        offset = movement.rotate(w-pivot, 180-pivot[0,4])
-                        e.move(offset[0,0], offset[0,1], -(w[0,2]-pivot[0,2])*time_scale.parsed_value).rotate(0,0,np.deg2rad(w[0,4]-pivot[0,4]))
-                        if copy_mode:
-                            e.material(copy_color.value, copy_opacity.parsed_value/2)
-                        else:
-                            e.material(move_color.value, move_opacity.parsed_value/2)
-                        self.cursors[t] = e
-            self._update_cursors()
+                        c.delete()
+                pivot = walls[self.drag_time]
+                preview_settings = sp.parse_settings()
+                with self.cursors[self.drag_time]:
+                    for t in self.sources:
+                        if t != self.drag_time:
+                            w = walls[t]
+                            relative = np.array([[0.0,0.0,0.0, w[0,3], 0.0]])
+                            e = preview_scene.wall_extrusion(relative, preview_settings.wall.size * time_scale.parsed_value)
+                            offset = movement.rotate(w-pivot, 180-pivot[0,4])
+                            e.move(offset[0,0], offset[0,1], -(w[0,2]-pivot[0,2])*time_scale.parsed_value).rotate(0,0,np.deg2rad(w[0,4]-pivot[0,4]))
+                            if copy_mode:
+                                e.material(copy_color.value, copy_opacity.parsed_value/2)
+                            else:
+                                e.material(move_color.value, move_opacity.parsed_value/2)
+                            self.cursors[t] = e
+                self._update_cursors()
 
         def end_drag(self, xyt: tuple[float, float, float]) -> None:
             if self.drag_time not in walls:
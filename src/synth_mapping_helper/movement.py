@@ -1,4 +1,4 @@
-from functools import wraps
+from functools import lru_cache, wraps
 import numpy as np
 
 from .synth_format import WALL_MIRROR_ID, WALL_TYPES
@@ -76,12 +76,11 @@ def outset(
     data: "numpy array (n, m)", outset_scalar: float, direction: int = 1
 ) -> "numpy array (n, 3+)":
     """move positions outwards"""
-    zero_mask = np.logical_and(np.isclose(data[..., 0], 0, atol=1e-5), np.isclose(data[..., 1], 0, atol=1e-5))  # ignore xy close to 0,0
-    angles = np.arctan2(data[~zero_mask, 1], data[~zero_mask, 0])
-    normalized = np.zeros(data.shape)
-    normalized[~zero_mask, 0] = np.cos(angles)
-    normalized[~zero_mask, 1] = np.sin(angles)
-    return data + normalized * outset_scalar
+    moved = (np.abs(data[..., :2]) > 1e-5).any(axis=-1)  # ignore xy close to 0,0
+    out = data.astype(float)  # always a copy
+    xy = data[moved, :2]
+    out[moved, :2] += xy * (outset_scalar / np.hypot(xy[:, 0], xy[:, 1]))[:, np.newaxis]
+    return out
 
 @add_basic_pivot_wrapper
 def scale(
@@ -105,18 +104,25 @@ def scale(
     return output
 
 
+@lru_cache(maxsize=256)
+def _rot_matrix(angle: float) -> "numpy array (2, 2)":
+    """xy rotation matrix (for row vectors), cached since the same angles tend to be used over and over"""
+    rad_ang = np.radians(angle)
+    rot_matrix = np.array([
+        [np.cos(rad_ang), np.sin(rad_ang)],
+        [-np.sin(rad_ang), np.cos(rad_ang)],
+    ])
+    rot_matrix.flags.writeable = False  # shared between calls
+    return rot_matrix
+
 @add_basic_pivot_wrapper
 def rotate(
     data: "numpy array (n, 3+)", angle: float, direction: int = 1
 ) -> "numpy array (n, 3+)":
     """rotate positions anticlockwise around center"""
-    rad_ang = np.radians(angle * direction)
-    rot_matrix = np.identity(data.shape[-1])
-    rot_matrix[:2, :2] = [
-        [np.cos(rad_ang), np.sin(rad_ang)],
-        [-np.sin(rad_ang), np.cos(rad_ang)],
-    ]
-    out = data.dot(rot_matrix)
+    # only xy change, so skip the identity part of the matrix
+    out = data.astype(float)  # always a copy
+    out[..., :2] = data[..., :2].dot(_rot_matrix(angle * direction))
     if data.shape[-1] >= 5:
         # just add to wall rotation (unless it is a crouch wall)
         not_crouch = (out[..., 3] != WALL_TYPES["crouch"][0])
@@ -104,7 +104,8 @@ def split_rails(notes: SINGLE_COLOR_NOTES, *, direction: int = 1) -> SINGLE_COLO
                 # when there is a existing node at the current time, leave it be
                 out[current_rail_start] = previous_nodes[: last_index + 1]
             else:
-                # else replace the next one with note to finish the rail and include it
+                # else replace the next one with note to finish the rail and include it (on a copy, the input arrays are shared)
+                previous_nodes = previous_nodes.copy()
                 previous_nodes[last_index + 1] = nodes[0]
                 out[current_rail_start] = previous_nodes[: last_index + 2]
 
@@ -396,6 +397,7 @@ def reinterpolation_smoothing(notes: SINGLE_COLOR_NOTES, iterations: int = 3, re
             rails.append(notes[time])
     out = singles.copy() if singles_mode == "anchor" else {}
     for rail_nodes in rails:
+        rail_nodes = rail_nodes.copy()  # nodes may be snapped below, the input arrays must not change
         rail_t = rail_nodes[:,2]
         a_idx = []
         b_idx = []
@@ -293,14 +293,16 @@ class DataContainer:
             "rails": {},
             "rail_nodes": {},
         }
-        for wall in self.walls.values():
-            out["walls"][WALL_LOOKUP[wall[0, 3]]] += 1
+        wall_ids = np.fromiter((w[0, 3] for w in self.walls.values()), dtype=float, count=len(self.walls))
+        for wall_id, count in zip(*np.unique(wall_ids, return_counts=True)):
+            out["walls"][WALL_LOOKUP[int(wall_id)]] = int(count)
         for t in NOTE_TYPES:
-            n_nodes = [n.shape[0] for n in getattr(self, t).values()]
-            notes = sum(1 if n==1 else 0 for n in n_nodes)
+            notes_dict = getattr(self, t)
+            n_nodes = np.fromiter((n.shape[0] for n in notes_dict.values()), dtype=int, count=len(notes_dict))
+            notes = int(np.count_nonzero(n_nodes == 1))
             out["notes"][t] = notes
             out["rails"][t] = len(n_nodes) - notes
-            out["rail_nodes"][t] = sum(n_nodes) - len(n_nodes)
+            out["rail_nodes"][t] = int(n_nodes.sum()) - len(n_nodes)
         for e in ("walls", "notes", "rails", "rail_nodes"):
             out[e]["total"] = sum(out[e].values())
         return out | {"lights": len(self.lights), "effects": len(self.effects)}
@@ -364,11 +366,15 @@ class DataContainer:
                 setattr(self, t, unaffected | f(affected, *args, direction=(-1 if mirror_left and t == "left" else 1), **kwargs))
 
     def filtered(self, types: tuple[str, ...] = ALL_TYPES, rail_filter: RailFilter | None = None) -> "DataContainer":
+        if not rail_filter and all(t in types for t in ALL_TYPES):
+            # nothing to filter: only copy the dicts, the object arrays are shared (like in the filtered path below),
+            # so functions working on containers must not modify arrays in place but create new ones
+            return dataclasses.replace(self, **{t: dict(getattr(self, t)) for t in NOTE_TYPES + ("walls", "lights", "effects")})
         new_notes: dict[str, SINGLE_COLOR_NOTES] = {}
         for t in NOTE_TYPES:
             if t not in types:
                 new_notes[t] = {}
-            if not rail_filter:
+            elif not rail_filter:
                 new_notes[t] = getattr(self, t)
             else:
                 new_notes[t] = {
@@ -409,14 +415,13 @@ class DataContainer:
         # type, data
         first: tuple[str, "numpy array (3+)"] | None = None
         for t in types:
-            if t not in NOTE_TYPES or not rail_filter:
+            ty_objs = self.get_object_dict(t)
+            if t in NOTE_TYPES and rail_filter:
                 # rail filter only affects note types
-                ty_objs = sorted(self.get_object_dict(t).items())
-            else:
-                ty_objs = sorted((ti, nodes) for ti, nodes in self.get_object_dict(t).items() if rail_filter.matches(nodes))
+                ty_objs = {ti: nodes for ti, nodes in ty_objs.items() if rail_filter.matches(nodes)}
             if not ty_objs:
                 continue
-            _, ty_first = ty_objs[0]
+            ty_first = ty_objs[min(ty_objs)]
             if first is None or ty_first[0,2] < first[1][2]:
                 first = t, ty_first[0]
         return first
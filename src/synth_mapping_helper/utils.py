@@ -1,3 +1,4 @@
+from math import gcd
 from typing import Any, Union
 
 import numpy as np
@@ -114,20 +115,23 @@ def parse_position(val: str) -> tuple[float, float, Union[float, SecondFloat]]:
     return (x, y, t)
 
 def pretty_fraction(val: float) -> str:
-    if round(val, 4).is_integer():
-        return str(int(round(val, 4)))
-    if round(val*192, 4).is_integer():
+    rounded = round(val, 4)
+    if rounded.is_integer():
+        return str(int(rounded))
+    ticks = round(val*192, 4)
+    if ticks.is_integer():
+        # math.gcd, np.gcd has a lot of overhead for single values
         if val < 1:
             # regular fraction: a/b
-            v = int(round(val*192, 4))
-            gcd = np.gcd(v,192)
-            return f"{v//gcd}/{192//gcd}"
+            v = int(ticks)
+            div = gcd(v, 192)
+            return f"{v//div}/{192//div}"
         else:
             # mixed fraction: i a/b
             i = int(val)
             v = int(round((val-i)*192, 4))
-            gcd = np.gcd(v,192)
-            return f"{i} {v//gcd}/{192//gcd}"
+            div = gcd(v, 192)
+            return f"{i} {v//div}/{192//div}"
     return str(val)
 
 def pretty_time_delta(seconds: float) -> str:
@@ -0,0 +1,73 @@
+import unittest
+
+import numpy as np
+
+from synth_mapping_helper.analysis import density, _compact_polyline
+
+
+def _reference_density(times: list[float], window: float) -> "numpy array (n, 2)":
+    # sliding window over the sorted times, one step at a time
+    if not len(times):
+        return np.zeros((0, 2))
+    step_t: list[float] = []
+    step_c: list[int] = []
+    step_d: list[int] = []
+    sorted_t = sorted(times)
+    head = 0  # first visible entry of sorted_t
+    c = 0  # tracks number of visible entries
+    for t in sorted_t:
+        start = t - window
+        while c and sorted_t[head] < start:
+            step_t.append(sorted_t[head])
+            step_c.append(c)
+            step_d.append(-1)
+            head += 1
+            c -= 1
+        step_t.append(start)
+        step_c.append(c)
+        step_d.append(1)
+        c += 1
+    for t in sorted_t[head:]:
+        step_t.append(t)
+        step_c.append(c)
+        step_d.append(-1)
+        c -= 1
+    plot_data = np.empty((len(step_t)*2, 2))
+    plot_data[:,0] = np.repeat(step_t, 2)
+    plot_data[0::2,1] = step_c
+    plot_data[1::2,1] = np.add(step_c, step_d)
+    return _compact_polyline(plot_data)
+
+
+class TestDensity(unittest.TestCase):
+    def assertMatchesReference(self, times: list[float], window: float) -> None:
+        np.testing.assert_array_equal(density(times, window).plot_data, _reference_density(times, window))
+
+    def test_edge_cases(self):
+        cases = {
+            "empty": [],
+            "single": [1.5],
+            "identical": [2.0, 2.0, 2.0],
+            "window apart": [0.0, 1.0, 2.0, 3.0],
+            "unsorted with duplicates": [3.0, 1.0, 1.0, 2.5, 0.0, 2.5],
+        }
+        for name, times in cases.items():
+            with self.subTest(name):
+                self.assertMatchesReference(times, 1.0)
+        self.assertEqual(density([], 1.0).plot_data.shape, (0, 2))
+
+    def test_random(self):
+        rng = np.random.default_rng(0)
+        for i in range(50):
+            with self.subTest(i):
+                n = int(rng.integers(1, 200))
+                # quantized, so ties between times and window edges are common
+                times = (rng.integers(0, 400, n) / 8).tolist()
+                window = float(rng.choice([0.125, 0.5, 1.0, 4.0]))
+                self.assertMatchesReference(times, window)
+                # numpy input gives the same result as a list
+                np.testing.assert_array_equal(density(np.array(times), window).plot_data, density(times, window).plot_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+
+import numpy as np
+
+from synth_mapping_helper import synth_format, movement
+from synth_mapping_helper.gui_tabs.stacking import _stack
+
+
+def _random_data(seed: int) -> synth_format.DataContainer:
+    rng = np.random.default_rng(seed)
+    d = synth_format.DataContainer()
+    for t in synth_format.NOTE_TYPES:
+        notes = {}
+        for _ in range(20):
+            time = round(rng.uniform(0, 100) * 4) / 4
+            nodes = 1 if rng.random() < 0.7 else int(rng.integers(2, 5))
+            notes[time] = np.column_stack([rng.uniform(-5, 5, nodes), rng.uniform(-4, 4, nodes), time + np.arange(nodes) * 0.5])
+        setattr(d, t, notes)
+    wall_ids = [i for i, _ in synth_format.WALL_TYPES.values()]
+    for _ in range(20):
+        time = round(rng.uniform(0, 100) * 8) / 8
+        d.walls[time] = np.array([[rng.uniform(-5, 5), rng.uniform(-4, 4), time, float(rng.choice(wall_ids)), rng.uniform(-180, 180)]])
+    d.lights = {float(t): np.array([[0, 0, float(t)]]) for t in range(0, 50, 3)}
+    d.effects = {float(t): np.array([[0, 0, float(t)]]) for t in range(1, 50, 5)}
+    return d
+
+
+def _reference_stack(
+    d: synth_format.DataContainer, count: int, pivot, offset, scale, rotation: float, wall_rotation: float, outset: float,
+    random_offset=None, random_angle: float = 0,
+) -> None:
+    # one copy after another, using the movement functions (random values are fixed, so this is deterministic)
+    pivot = np.array(pivot, dtype=float)
+    stacking = d.filtered()
+    for _ in range(count):
+        stacking.apply_for_all(movement.scale, scale_3d=scale, pivot=pivot)
+        if rotation:
+            stacking.apply_for_all(movement.rotate, angle=rotation, pivot=pivot)
+        if wall_rotation:
+            stacking.apply_for_walls(movement.rotate, angle=wall_rotation, relative=True)
+        stacking.apply_for_all(movement.offset, offset_3d=offset)
+        if outset:
+            stacking.apply_for_all(movement.outset, outset_scalar=outset, pivot=pivot)
+        if random_offset is None and not random_angle:
+            d.merge(stacking)
+            continue
+        tmp = stacking.filtered()
+        if random_offset is not None:
+            tmp.apply_for_all(movement.offset, offset_3d=[random_offset[0], random_offset[1], 0])
+        if random_angle:
+            tmp.apply_for_all(movement.rotate, angle=random_angle, pivot=pivot)
+        d.merge(tmp)
+
+
+class TestStack(unittest.TestCase):
+    PARAMETERS = [
+        dict(count=5, pivot=(0, 0, 0), offset=(0, 0, 1), scale=(1, 1, 1), rotation=0, wall_rotation=0, outset=0),
+        dict(count=7, pivot=(1, -2, 0), offset=(0.5, 0.25, 0.5), scale=(1, 1, 1), rotation=15, wall_rotation=0, outset=0),
+        dict(count=6, pivot=(1, -2, 0), offset=(0.5, 0.25, 0.5), scale=(1.1, 0.9, 1), rotation=-20, wall_rotation=7, outset=0),
+        dict(count=6, pivot=(1, -2, 0), offset=(0.5, 0.25, 2), scale=(-1, 1, 1), rotation=10, wall_rotation=3, outset=0),
+        dict(count=5, pivot=(0, 0, 0), offset=(0, 0, 3), scale=(-1, -1, 1), rotation=10, wall_rotation=3, outset=0),
+        dict(count=4, pivot=(0.5, 0, 0), offset=(0, 0, -1000), scale=(1, 1, -1), rotation=10, wall_rotation=3, outset=0),
+        dict(count=6, pivot=(1, -2, 0), offset=(0.5, 0.25, 0.5), scale=(1.05, 1.05, 1), rotation=12, wall_rotation=0, outset=0.5),
+        dict(count=6, pivot=(0, 0, 0), offset=(0, 0, 0.5), scale=(-1.05, 1, 1), rotation=12, wall_rotation=5, outset=-0.3),
+        dict(count=40, pivot=(0, 0, 0), offset=(0, 0, 0.25), scale=(1, 1, 1), rotation=9, wall_rotation=0, outset=0),
+    ]
+    # zero-width ranges, so the random values are known
+    RANDOM = [
+        (dict(random_ranges_offset=None, random_step_offset=None, random_ranges_angle=None, random_step_angle=None), {}),
+        (dict(random_ranges_offset=[((1, 2), (1, 2))], random_step_offset=None, random_ranges_angle=None, random_step_angle=None), dict(random_offset=(1, 2))),
+        (dict(random_ranges_offset=None, random_step_offset=None, random_ranges_angle=[(30, 30)], random_step_angle=None), dict(random_angle=30)),
+        (dict(random_ranges_offset=[((1, 2), (1, 2))], random_step_offset=(0.5, 0.5), random_ranges_angle=[(30, 30)], random_step_angle=5), dict(random_offset=(1, 2), random_angle=30)),
+    ]
+
+    def assertSameData(self, a: synth_format.DataContainer, b: synth_format.DataContainer) -> None:
+        for t in (*synth_format.NOTE_TYPES, "walls", "lights", "effects"):
+            objs_a, objs_b = getattr(a, t), getattr(b, t)
+            self.assertEqual(len(objs_a), len(objs_b), t)
+            np.testing.assert_allclose(sorted(objs_a), sorted(objs_b), atol=1e-6, err_msg=t)
+            for time_a, time_b in zip(sorted(objs_a), sorted(objs_b)):
+                np.testing.assert_allclose(objs_a[time_a], objs_b[time_b], atol=1e-6, err_msg=f"{t} at {time_a}")
+
+    def test_matches_reference(self):
+        for i, parameters in enumerate(self.PARAMETERS):
+            for random_args, reference_args in self.RANDOM:
+                with self.subTest(parameters=i, random=random_args):
+                    expected = _random_data(i)
+                    _reference_stack(expected, **parameters, **reference_args)
+                    actual = _random_data(i)
+                    _stack(actual, **parameters, **random_args)
+                    self.assertSameData(actual, expected)
+
+    def test_random_ranges(self):
+        for step_offset, step_angle in ((None, None), ((1, 1), 5)):
+            with self.subTest(step_offset=step_offset, step_angle=step_angle):
+                d = synth_format.DataContainer()
+                d.right = {0.0: np.array([[0.0, 0.0, 0.0]])}
+                counts = _stack(
+                    d, count=300, pivot=(0, 0, 0), offset=(0, 0, 1), scale=(1, 1, 1), rotation=0, wall_rotation=0, outset=0,
+                    random_ranges_offset=[((-3, 0), (-2, 0)), ((2, 1), (3, 1))], random_step_offset=step_offset,
+                    random_ranges_angle=[(-10, -5), (40, 50)], random_step_angle=step_angle,
+                )
+                self.assertEqual(counts["notes"], 300)
+                positions = np.concatenate([n for t, n in sorted(d.right.items()) if t > 0])
+                self.assertEqual(len(positions), 300)
+                # rotating around the pivot keeps the distance of the offset
+                distances = np.hypot(positions[:, 0], positions[:, 1])
+                in_first = (distances >= 2 - 1e-6) & (distances <= 3 + 1e-6)
+                in_second = (distances >= np.hypot(2, 1) - 1e-6) & (distances <= np.hypot(3, 1) + 1e-6)
+                self.assertTrue((in_first | in_second).all())
+
+    def test_no_copies(self):
+        d = _random_data(0)
+        counts = _stack(
+            d, count=0, pivot=(0, 0, 0), offset=(0, 0, 1), scale=(1, 1, 1), rotation=0, wall_rotation=0, outset=0,
+            random_ranges_offset=None, random_step_offset=None, random_ranges_angle=None, random_step_angle=None,
+        )
+        self.assertEqual(sum(counts.values()), 0)
+        self.assertSameData(d, _random_data(0))
+
+
+if __name__ == "__main__":
+    unittest.main()